@@ -1,58 +1,110 @@
 """Configuration for API service."""
 
 import os
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load variables from a local .env file when running outside Docker.
-load_dotenv()
+# Production containers set ENV=prod and inject variables directly, so the
+# file lookup and parse are skipped there.
+if os.getenv("ENV", "dev") != "prod" and os.path.exists(".env"):
+    load_dotenv(override=False)
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
     """Application configuration loaded from environment variables."""
 
     # Supabase
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
-    SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    SUPABASE_URL: str
+    SUPABASE_SERVICE_ROLE_KEY: str
+    # Optional direct Postgres DSN for hot-path lookups (see shared/pg.py)
+    SUPABASE_DB_URL: str
 
     # SparkPost
-    SPARKPOST_API_KEY: str = os.getenv("SPARKPOST_API_KEY", "")
-    
+    SPARKPOST_API_KEY: str
+
     # AI
-    GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    GROQ_API_KEY: str
 
     # Secrets
-    UNSUBSCRIBE_SECRET: str = os.getenv("UNSUBSCRIBE_SECRET", "")
+    UNSUBSCRIBE_SECRET: str
+    # Signs admin bearer tokens; must differ from UNSUBSCRIBE_SECRET
+    AUTH_TOKEN_SECRET: str
+    AUTH_TOKEN_TTL_SECONDS: int
 
     # Frontend
-    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
+    FRONTEND_URL: str
 
     # Timezone for working hours (9am-5pm)
-    TIMEZONE: str = os.getenv("TIMEZONE", "America/Los_Angeles")
+    TIMEZONE: str
 
     # Disable working hours scheduling restrictions (9am-5pm)
     # When set to 'true', campaigns can run 24/7
-    DISABLE_WORKING_HOURS: bool = os.getenv("DISABLE_WORKING_HOURS", "false").lower() == "true"
+    DISABLE_WORKING_HOURS: bool
 
     # Scheduling
-    WORKING_HOUR_START: int = int(os.getenv("WORKING_HOUR_START", "9"))
-    WORKING_HOUR_END: int = int(os.getenv("WORKING_HOUR_END", "17"))
-    INTERVAL_MINUTES: float = float(os.getenv("INTERVAL_MINUTES", "3.5"))
-    JITTER_SECONDS_MAX: int = int(os.getenv("JITTER_SECONDS_MAX", "30"))
+    WORKING_HOUR_START: int
+    WORKING_HOUR_END: int
+    INTERVAL_MINUTES: float
+    JITTER_SECONDS_MAX: int
+
+    # Logging for the SparkPost webhook path (routers/webhooks.py and
+    # shared/webhook_processor.py); DEBUG adds a line per event
+    WEBHOOK_LOG_LEVEL: str
 
     @classmethod
-    def validate(cls) -> None:
-        """Validate that all required configuration variables are set."""
-        if not cls.SUPABASE_URL:
+    def from_env(cls) -> "Config":
+        """Build a configuration snapshot from the current environment."""
+        return cls(
+            SUPABASE_URL=os.getenv("SUPABASE_URL", ""),
+            SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY", ""),
+            SUPABASE_DB_URL=os.getenv("SUPABASE_DB_URL", ""),
+            SPARKPOST_API_KEY=os.getenv("SPARKPOST_API_KEY", ""),
+            GROQ_API_KEY=os.getenv("GROQ_API_KEY", ""),
+            UNSUBSCRIBE_SECRET=os.getenv("UNSUBSCRIBE_SECRET", ""),
+            AUTH_TOKEN_SECRET=os.getenv("AUTH_TOKEN_SECRET", ""),
+            AUTH_TOKEN_TTL_SECONDS=int(os.getenv("AUTH_TOKEN_TTL_SECONDS", "3600")),
+            FRONTEND_URL=os.getenv("FRONTEND_URL", "http://localhost:3000"),
+            TIMEZONE=os.getenv("TIMEZONE", "America/Los_Angeles"),
+            DISABLE_WORKING_HOURS=os.getenv("DISABLE_WORKING_HOURS", "false").lower() == "true",
+            WORKING_HOUR_START=int(os.getenv("WORKING_HOUR_START", "9")),
+            WORKING_HOUR_END=int(os.getenv("WORKING_HOUR_END", "17")),
+            INTERVAL_MINUTES=float(os.getenv("INTERVAL_MINUTES", "3.5")),
+            JITTER_SECONDS_MAX=int(os.getenv("JITTER_SECONDS_MAX", "30")),
+            WEBHOOK_LOG_LEVEL=os.getenv("WEBHOOK_LOG_LEVEL", "INFO").upper(),
+        )
+
+    @lru_cache(maxsize=1)
+    def validate(self) -> None:
+        """Validate that all required configuration variables are set.
+
+        Only a passing check is cached, so a misconfigured process keeps
+        failing on every call.
+        """
+        if not self.SUPABASE_URL:
             raise ValueError("SUPABASE_URL environment variable is required")
-        if not cls.SUPABASE_SERVICE_ROLE_KEY:
+        if not self.SUPABASE_SERVICE_ROLE_KEY:
             raise ValueError(
                 "SUPABASE_SERVICE_ROLE_KEY environment variable is required"
             )
-        if not cls.SPARKPOST_API_KEY:
+        if not self.SPARKPOST_API_KEY:
             raise ValueError("SPARKPOST_API_KEY environment variable is required")
-        if not cls.GROQ_API_KEY:
+        if not self.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY environment variable is required")
-        if not cls.UNSUBSCRIBE_SECRET:
+        if not self.UNSUBSCRIBE_SECRET:
             raise ValueError("UNSUBSCRIBE_SECRET environment variable is required")
+        if not self.AUTH_TOKEN_SECRET:
+            raise ValueError("AUTH_TOKEN_SECRET environment variable is required")
+        if self.AUTH_TOKEN_SECRET == self.UNSUBSCRIBE_SECRET:
+            raise ValueError("AUTH_TOKEN_SECRET must differ from UNSUBSCRIBE_SECRET")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Config:
+    """Return the process-wide configuration snapshot."""
+    return Config.from_env()
+
 
+settings = get_settings()
@@ -1,44 +1,74 @@
 """Main FastAPI application entry point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from config import Config
+from fastapi.responses import ORJSONResponse
+from config import settings
+from shared.db import get_supabase_admin, reset_supabase_admin
+from shared.email_sender import close_sparkpost_client
+from shared.pg import close_pg_pool, init_pg_pool
+from middleware.health import HealthCheckMiddleware
 
 # Import routers
-from routers import campaigns, emails, recipients, webhooks
+from routers import auth, campaigns, emails, recipients, webhooks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate config and warm the database clients on startup.
+
+    Pools are released on shutdown.
+    """
+    settings.validate()
+    get_supabase_admin()
+    await init_pg_pool()
+    yield
+    await close_sparkpost_client()
+    await close_pg_pool()
+    reset_supabase_admin()
 
-# Validate config on startup
-Config.validate()
 
 app = FastAPI(
     title="Campaign API",
     description="Unified API service for campaign management",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[Config.FRONTEND_URL],
+    allow_origins=[settings.FRONTEND_URL],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
 # Include routers
+app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(campaigns.router, prefix="/api/v1/campaigns", tags=["campaigns"])
 app.include_router(emails.router, prefix="/api/v1/campaigns", tags=["emails"])
 app.include_router(recipients.router, prefix="/api/v1/campaigns", tags=["recipients"])
 app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "ok"}
+# Added last so it wraps CORS and answers liveness probes (GET /health) first;
+# there is no /health route behind it
+app.add_middleware(HealthCheckMiddleware)
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        access_log=False,
+    )
 
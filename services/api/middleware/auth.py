@@ -3,50 +3,193 @@
 from fastapi import HTTPException, Depends, Header
 from typing import Optional
 import base64
+import binascii
+import hashlib
+import hmac
+import time
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
+from config import settings
 from shared.db import get_supabase_admin
+from shared.pg import get_pg_pool
+
+# Verified admin records keyed by a digest of the Authorization header.
+# Entries expire after a minute so password/role changes propagate quickly.
+_admin_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+# Queried through the asyncpg pool when SUPABASE_DB_URL is set.
+_ADMIN_QUERY = "SELECT id, email, password, role FROM admin_users WHERE email = $1 LIMIT 1"
+
+# Built once; argon2 parameters are read from the stored hash on verify.
+_password_hasher = PasswordHasher()
+
+
+def _password_matches(stored: Optional[str], password: str) -> bool:
+    """Check a password against the stored admin_users value.
+
+    Argon2 hashes are verified with the module-level hasher. Rows that have
+    not been migrated yet still hold the plaintext password, which is compared
+    in constant time.
+    """
+    if not stored:
+        return False
+    if stored.startswith("$argon2"):
+        try:
+            return _password_hasher.verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+
+_TOKEN_KEY = settings.AUTH_TOKEN_SECRET.encode("utf-8")
+_TOKEN_SIG_LEN = hashlib.sha256().digest_size
+
+
+def create_admin_token(admin: dict) -> tuple[str, int]:
+    """Issue a signed bearer token for an authenticated admin.
+
+    The token is base64url(payload + HMAC-SHA256(payload)) where payload is
+    ``exp|id|role|email``.
+
+    Returns:
+        Tuple of (token, expiry as a unix timestamp)
+    """
+    exp = int(time.time()) + settings.AUTH_TOKEN_TTL_SECONDS
+    payload = f"{exp}|{admin['id']}|{admin['role']}|{admin['email']}".encode("utf-8")
+    sig = hmac.new(_TOKEN_KEY, payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(payload + sig).decode("ascii"), exp
+
+
+def _verify_token(token: str) -> dict:
+    """Return the admin encoded in a bearer token, or raise 401."""
+    try:
+        raw = base64.urlsafe_b64decode(token)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    if len(raw) <= _TOKEN_SIG_LEN:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    payload, sig = raw[:-_TOKEN_SIG_LEN], raw[-_TOKEN_SIG_LEN:]
+    expected = hmac.new(_TOKEN_KEY, payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, sig):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    try:
+        exp, admin_id, role, email = payload.decode("utf-8").split("|", 3)
+        expired = int(exp) < time.time()
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if expired:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return {"id": admin_id, "email": email, "role": role}
+
+
+def _parse_basic(authorization: str) -> tuple[str, str]:
+    """Split a Basic Authorization header into (email, password), or raise 401."""
+    try:
+        raw = binascii.a2b_base64(authorization[6:], strict_mode=True)
+        sep = raw.find(b":")
+        if sep < 0:
+            raise ValueError("missing credentials separator")
+        email = raw[:sep].decode("utf-8")
+        password = raw[sep + 1:].decode("utf-8")
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid authorization format")
+    return email, password
+
+
+async def _authenticate(email: str, password: str) -> dict:
+    """Check credentials against admin_users and return the admin, or raise 401."""
+    pool = get_pg_pool()
+    if pool is not None:
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(_ADMIN_QUERY, email)
+        data = dict(row) if row else None
+    else:
+        supabase = get_supabase_admin()
+        response = (
+            supabase.table("admin_users")
+            .select("id, email, password, role")
+            .eq("email", email)
+            .limit(1)
+            .maybe_single()
+            .execute()
+        )
+        data = response.data if response is not None else None
+
+    if not data:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if not _password_matches(data.get("password"), password):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    return {
+        "id": str(data["id"]),
+        "email": data["email"],
+        "role": data["role"]
+    }
+
+
+async def verify_admin_basic(
+    authorization: Optional[str] = Header(None)
+) -> dict:
+    """Verify admin Basic credentials against the admin_users table.
+
+    Used where a bearer token must not be enough (issuing new tokens), so
+    the credentials are always checked against the database, uncached.
+
+    Args:
+        authorization: Authorization header value
+
+    Returns:
+        Admin user dict with id, email, role
+
+    Raises:
+        HTTPException: If authentication fails
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+
+    if not authorization.startswith("Basic "):
+        raise HTTPException(status_code=401, detail="Invalid authorization format")
+
+    return await _authenticate(*_parse_basic(authorization))
 
 
 async def verify_admin(
     authorization: Optional[str] = Header(None)
 ) -> dict:
     """Verify admin user from Authorization header.
-    
-    Expects Basic auth: Authorization: Basic base64(email:password)
-    
+
+    Accepts either a bearer token from ``POST /api/v1/auth/login``
+    (Authorization: Bearer <token>) or Basic auth
+    (Authorization: Basic base64(email:password)).
+
     Args:
         authorization: Authorization header value
-        
+
     Returns:
         Admin user dict with id, email, role
-        
+
     Raises:
         HTTPException: If authentication fails
     """
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
-    
+
+    if authorization.startswith("Bearer "):
+        return _verify_token(authorization[7:])
+
     if not authorization.startswith("Basic "):
         raise HTTPException(status_code=401, detail="Invalid authorization format")
-    
-    try:
-        encoded = authorization.split(" ", 1)[1]
-        decoded = base64.b64decode(encoded).decode("utf-8")
-        email, password = decoded.split(":", 1)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid authorization format")
-    
-    supabase = get_supabase_admin()
-    response = supabase.table("admin_users").select("id, email, password, role").eq("email", email).single().execute()
-    
-    if not response.data:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    if response.data["password"] != password:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    return {
-        "id": response.data["id"],
-        "email": response.data["email"],
-        "role": response.data["role"]
-    }
 
+    cache_key = hashlib.sha256(authorization.encode("utf-8")).digest()
+    cached = _admin_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    admin = await _authenticate(*_parse_basic(authorization))
+    _admin_cache[cache_key] = admin
+    return admin
@@ -0,0 +1,35 @@
+"""Liveness probe short-circuit for the API service."""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+HEALTH_PATH = "/health"
+_HEALTH_METHODS = frozenset({"GET", "HEAD"})
+_HEALTH_BODY = b'{"status":"ok"}'
+_HEALTH_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_HEALTH_BODY)).encode("ascii")),
+]
+
+
+class HealthCheckMiddleware:
+    """Answer ``GET``/``HEAD /health`` before the rest of the middleware stack runs.
+
+    Load balancer probes hit this path constantly; responding here skips
+    CORS handling and routing entirely.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["path"] == HEALTH_PATH
+            and scope["method"] in _HEALTH_METHODS
+        ):
+            await send({"type": "http.response.start", "status": 200, "headers": _HEALTH_HEADERS})
+            # HEAD gets the same headers without a body
+            body = _HEALTH_BODY if scope["method"] == "GET" else b""
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
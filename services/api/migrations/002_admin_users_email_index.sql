@@ -0,0 +1,28 @@
+-- Unique index for the admin Basic-auth lookup (middleware/auth.py), which
+-- filters on email. Passwords are deliberately not INCLUDEd: that would copy
+-- every hash into a second on-disk structure, and the lookup only runs once
+-- per credential per minute thanks to the verified-admin cache.
+--
+-- Admin accounts are not deleted automatically; if any email appears more
+-- than once the migration stops and lists them so they can be merged by hand.
+DO $$
+DECLARE
+  v_duplicates text;
+BEGIN
+  SELECT string_agg(email, ', ')
+  INTO v_duplicates
+  FROM (
+    SELECT email
+    FROM admin_users
+    GROUP BY email
+    HAVING count(*) > 1
+  ) dup;
+
+  IF v_duplicates IS NOT NULL THEN
+    RAISE EXCEPTION 'admin_users has duplicate emails: %', v_duplicates;
+  END IF;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS admin_users_email_uk
+  ON admin_users (email);
@@ -0,0 +1,13 @@
+-- Sent/failed email counts for a page of campaigns in a single round trip.
+-- Used by GET /api/v1/campaigns (routers/campaigns.py::list_campaigns).
+CREATE OR REPLACE FUNCTION campaign_email_status_counts(campaign_ids uuid[])
+RETURNS TABLE (campaign_id uuid, status text, count bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT q.campaign_id, q.status::text, count(*)
+  FROM email_queue q
+  WHERE q.campaign_id = ANY(campaign_ids)
+    AND q.status IN ('sent', 'failed')
+  GROUP BY 1, 2;
+$$;
@@ -0,0 +1,25 @@
+-- Everything check_and_update_completed_campaign needs in one row:
+-- per-status counts plus how many pending emails are scheduled after p_now.
+CREATE OR REPLACE FUNCTION campaign_completion_snapshot(
+  p_campaign_id uuid,
+  p_now timestamptz
+)
+RETURNS TABLE (
+  queued_count bigint,
+  processing_count bigint,
+  sent_count bigint,
+  failed_count bigint,
+  future_count bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    count(*) FILTER (WHERE status = 'queued'),
+    count(*) FILTER (WHERE status = 'processing'),
+    count(*) FILTER (WHERE status = 'sent'),
+    count(*) FILTER (WHERE status = 'failed'),
+    count(*) FILTER (WHERE status IN ('queued', 'processing') AND scheduled_for > p_now)
+  FROM email_queue
+  WHERE campaign_id = p_campaign_id;
+$$;
@@ -0,0 +1,32 @@
+-- Set-based version of check_and_update_completed_campaign for the list page.
+-- Marks every campaign in ids that is still 'scheduled'/'sending' but has no
+-- pending emails left (and has processed at least one) as completed.
+CREATE OR REPLACE FUNCTION mark_completed_campaigns(ids uuid[])
+RETURNS TABLE (id uuid, status text, updated_at timestamptz)
+LANGUAGE sql
+VOLATILE
+AS $$
+  WITH stats AS (
+    SELECT
+      q.campaign_id,
+      count(*) FILTER (WHERE q.status = 'queued') AS queued,
+      count(*) FILTER (WHERE q.status = 'processing') AS processing,
+      count(*) FILTER (WHERE q.status IN ('sent', 'failed')) AS processed,
+      count(*) FILTER (
+        WHERE q.status IN ('queued', 'processing') AND q.scheduled_for > now()
+      ) AS future
+    FROM email_queue q
+    WHERE q.campaign_id = ANY(ids)
+    GROUP BY q.campaign_id
+  )
+  UPDATE campaigns c
+  SET status = 'completed', updated_at = now()
+  FROM stats s
+  WHERE c.id = s.campaign_id
+    AND c.status IN ('scheduled', 'sending')
+    AND s.queued = 0
+    AND s.processing = 0
+    AND s.processed > 0
+    AND s.future = 0
+  RETURNING c.id, c.status::text, c.updated_at;
+$$;
@@ -0,0 +1,25 @@
+-- Email counters and send timeline for GET /api/v1/campaigns/{id}/summary.
+CREATE OR REPLACE FUNCTION campaign_summary(p_id uuid)
+RETURNS TABLE (
+  sent_count bigint,
+  failed_count bigint,
+  queued_count bigint,
+  processing_count bigint,
+  staged_count bigint,
+  last_sent_at timestamptz,
+  next_scheduled_for timestamptz
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    count(*) FILTER (WHERE status = 'sent'),
+    count(*) FILTER (WHERE status = 'failed'),
+    count(*) FILTER (WHERE status = 'queued'),
+    count(*) FILTER (WHERE status = 'processing'),
+    count(*) FILTER (WHERE status = 'staged'),
+    max(sent_at) FILTER (WHERE status = 'sent'),
+    min(scheduled_for) FILTER (WHERE status = 'queued')
+  FROM email_queue
+  WHERE campaign_id = p_id;
+$$;
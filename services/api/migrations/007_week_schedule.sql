@@ -0,0 +1,29 @@
+-- Per-day queued/sent email counts for the dashboard's 7-day schedule.
+-- Days are calendar days in p_tz; the window is [p_start_utc, p_end_utc).
+CREATE OR REPLACE FUNCTION week_schedule(
+  p_tz text,
+  p_start_utc timestamptz,
+  p_end_utc timestamptz
+)
+RETURNS TABLE (day date, queued_count bigint, sent_count bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT t.day, sum(t.queued)::bigint, sum(t.sent)::bigint
+  FROM (
+    SELECT (scheduled_for AT TIME ZONE p_tz)::date AS day, count(*) AS queued, 0::bigint AS sent
+    FROM email_queue
+    WHERE status = 'queued'
+      AND scheduled_for >= p_start_utc
+      AND scheduled_for < p_end_utc
+    GROUP BY 1
+    UNION ALL
+    SELECT (sent_at AT TIME ZONE p_tz)::date, 0::bigint, count(*)
+    FROM email_queue
+    WHERE status = 'sent'
+      AND sent_at >= p_start_utc
+      AND sent_at < p_end_utc
+    GROUP BY 1
+  ) t
+  GROUP BY t.day;
+$$;
@@ -0,0 +1,16 @@
+-- Status histograms for GET /api/v1/campaigns/status.
+CREATE OR REPLACE FUNCTION email_status_totals()
+RETURNS TABLE (status text, count bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT status::text, count(*) FROM email_queue GROUP BY status;
+$$;
+
+CREATE OR REPLACE FUNCTION campaign_status_totals()
+RETURNS TABLE (status text, count bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT status::text, count(*) FROM campaigns GROUP BY status;
+$$;
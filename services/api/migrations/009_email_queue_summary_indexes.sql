@@ -0,0 +1,7 @@
+-- Composite indexes backing the campaign_summary / campaign_completion_snapshot
+-- aggregates: last sent_at per campaign and next queued scheduled_for.
+CREATE INDEX IF NOT EXISTS email_queue_campaign_status_sent_at_idx
+  ON email_queue (campaign_id, status, sent_at DESC);
+
+CREATE INDEX IF NOT EXISTS email_queue_campaign_status_scheduled_for_idx
+  ON email_queue (campaign_id, status, scheduled_for);
@@ -0,0 +1,29 @@
+-- Per-campaign sent/failed totals, embeddable from campaigns via PostgREST:
+--   campaigns?select=...,email_stats(sent_count,failed_count)
+-- security_invoker keeps email_queue's RLS in force for whoever queries the
+-- view (a plain view would run as its owner and bypass it).
+CREATE OR REPLACE VIEW campaign_email_stats
+WITH (security_invoker = true) AS
+  SELECT
+    campaign_id,
+    count(*) FILTER (WHERE status = 'sent') AS sent_count,
+    count(*) FILTER (WHERE status = 'failed') AS failed_count
+  FROM email_queue
+  GROUP BY campaign_id;
+
+-- Computed to-one relationship campaigns -> campaign_email_stats. PostgREST
+-- cannot infer a foreign key through the aggregate, so declare it explicitly.
+CREATE OR REPLACE FUNCTION email_stats(campaigns)
+RETURNS SETOF campaign_email_stats
+ROWS 1
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT * FROM campaign_email_stats WHERE campaign_id = $1.id;
+$$;
+
+-- Only the API (service role) reads these; keep them off the public roles.
+REVOKE ALL ON campaign_email_stats FROM anon, authenticated;
+REVOKE EXECUTE ON FUNCTION email_stats(campaigns) FROM PUBLIC, anon, authenticated;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,24 @@
+-- campaign_completion_snapshot now reads the clock server-side instead of
+-- taking p_now from the API, avoiding client/server clock skew.
+DROP FUNCTION IF EXISTS campaign_completion_snapshot(uuid, timestamptz);
+
+CREATE OR REPLACE FUNCTION campaign_completion_snapshot(p_campaign_id uuid)
+RETURNS TABLE (
+  queued_count bigint,
+  processing_count bigint,
+  sent_count bigint,
+  failed_count bigint,
+  future_count bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    count(*) FILTER (WHERE status = 'queued'),
+    count(*) FILTER (WHERE status = 'processing'),
+    count(*) FILTER (WHERE status = 'sent'),
+    count(*) FILTER (WHERE status = 'failed'),
+    count(*) FILTER (WHERE status IN ('queued', 'processing') AND scheduled_for > now())
+  FROM email_queue
+  WHERE campaign_id = p_campaign_id;
+$$;
@@ -0,0 +1,59 @@
+-- Replace a campaign's recipient list in one transaction: upsert the new set
+-- keyed on (campaign_id, contact_id), prune rows no longer selected and
+-- update campaigns.total_recipients. Returns the new total, or NULL when the
+-- campaign does not exist.
+-- Earlier imports inserted without deduplicating, so a pair can already
+-- appear more than once; keep the newest row per pair before indexing.
+DELETE FROM campaign_recipients cr
+USING (
+  SELECT
+    id,
+    row_number() OVER (
+      PARTITION BY campaign_id, contact_id
+      ORDER BY created_at DESC, id DESC
+    ) AS rn
+  FROM campaign_recipients
+) dup
+WHERE cr.id = dup.id
+  AND dup.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS campaign_recipients_campaign_contact_uk
+  ON campaign_recipients (campaign_id, contact_id);
+
+CREATE OR REPLACE FUNCTION replace_campaign_recipients(
+  p_campaign_id uuid,
+  p_recipients jsonb
+)
+RETURNS integer
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  v_total integer;
+BEGIN
+  PERFORM 1 FROM campaigns WHERE id = p_campaign_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO campaign_recipients (campaign_id, contact_id, selected_email)
+  SELECT p_campaign_id, r.contact_id, r.selected_email
+  FROM jsonb_to_recordset(p_recipients) AS r(contact_id uuid, selected_email text)
+  ON CONFLICT (campaign_id, contact_id)
+  DO UPDATE SET selected_email = EXCLUDED.selected_email;
+
+  DELETE FROM campaign_recipients cr
+  WHERE cr.campaign_id = p_campaign_id
+    AND NOT EXISTS (
+      SELECT 1
+      FROM jsonb_to_recordset(p_recipients) AS r(contact_id uuid)
+      WHERE r.contact_id = cr.contact_id
+    );
+
+  v_total := jsonb_array_length(p_recipients);
+
+  UPDATE campaigns SET total_recipients = v_total WHERE id = p_campaign_id;
+
+  RETURN v_total;
+END;
+$$;
@@ -0,0 +1,25 @@
+-- Second half of the chunked recipient import used for large lists: after the
+-- API has upserted the new set in batches, drop contacts that are no longer
+-- selected and update campaigns.total_recipients. Returns the new total.
+CREATE OR REPLACE FUNCTION prune_campaign_recipients(
+  p_campaign_id uuid,
+  p_contact_ids uuid[]
+)
+RETURNS integer
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  v_total integer;
+BEGIN
+  DELETE FROM campaign_recipients
+  WHERE campaign_id = p_campaign_id
+    AND contact_id <> ALL(p_contact_ids);
+
+  v_total := cardinality(p_contact_ids);
+
+  UPDATE campaigns SET total_recipients = v_total WHERE id = p_campaign_id;
+
+  RETURN v_total;
+END;
+$$;
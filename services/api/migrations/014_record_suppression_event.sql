@@ -0,0 +1,52 @@
+-- Apply a bounce / unsubscribe / spam complaint webhook event in one
+-- transaction: mark the contact's campaign_recipients row and globally
+-- suppress the contact by email. Returns the number of campaign_recipients
+-- rows updated, or NULL when no contact has that email.
+CREATE OR REPLACE FUNCTION record_suppression_event(
+  p_campaign_id uuid,
+  p_email text,
+  p_reason text
+)
+RETURNS integer
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  v_updated integer;
+BEGIN
+  IF p_reason NOT IN ('bounce', 'unsubscribe', 'spam_complaint') THEN
+    RAISE EXCEPTION 'unknown suppression reason: %', p_reason;
+  END IF;
+
+  PERFORM 1 FROM contacts WHERE email = p_email;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  UPDATE campaign_recipients cr
+  SET
+    status = CASE p_reason
+      WHEN 'bounce' THEN 'bounced'
+      WHEN 'unsubscribe' THEN 'unsubscribed'
+      ELSE 'spam_complaint'
+    END,
+    bounced_at = CASE WHEN p_reason = 'bounce' THEN now() ELSE cr.bounced_at END,
+    unsubscribed_at = CASE WHEN p_reason = 'unsubscribe' THEN now() ELSE cr.unsubscribed_at END
+  FROM contacts c
+  WHERE cr.contact_id = c.id
+    AND c.email = p_email
+    AND cr.campaign_id = p_campaign_id;
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+  UPDATE contacts
+  SET
+    globally_bounced = CASE WHEN p_reason = 'bounce' THEN true ELSE globally_bounced END,
+    globally_unsubscribed = CASE WHEN p_reason <> 'bounce' THEN true ELSE globally_unsubscribed END,
+    suppression_reason = p_reason,
+    suppression_date = now()
+  WHERE email = p_email;
+
+  RETURN v_updated;
+END;
+$$;
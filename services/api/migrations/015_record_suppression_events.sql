@@ -0,0 +1,30 @@
+-- Apply a whole SparkPost webhook batch of bounce / unsubscribe / spam
+-- complaint events in one call. p_events is a JSON array of
+-- {"campaign_id", "email", "reason"} objects, applied in array order through
+-- record_suppression_event (014) so a recipient's later events win. Returns
+-- the number of events whose email matched a contact.
+CREATE OR REPLACE FUNCTION record_suppression_events(p_events jsonb)
+RETURNS integer
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  v_event record;
+  v_matched integer := 0;
+BEGIN
+  FOR v_event IN
+    SELECT
+      (e.item->>'campaign_id')::uuid AS campaign_id,
+      e.item->>'email' AS email,
+      e.item->>'reason' AS reason
+    FROM jsonb_array_elements(p_events) WITH ORDINALITY AS e(item, ord)
+    ORDER BY e.ord
+  LOOP
+    IF record_suppression_event(v_event.campaign_id, v_event.email, v_event.reason) IS NOT NULL THEN
+      v_matched := v_matched + 1;
+    END IF;
+  END LOOP;
+
+  RETURN v_matched;
+END;
+$$;
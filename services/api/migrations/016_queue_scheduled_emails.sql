@@ -0,0 +1,30 @@
+-- Queue a page of scheduled emails in one statement: launch and retry tasks
+-- compute domain_index / from_email / scheduled_for per email and send them
+-- here as a JSON array instead of one UPDATE per email. p_clear_error also
+-- resets error_message (retrying failed emails). Returns the rows updated.
+CREATE OR REPLACE FUNCTION queue_scheduled_emails(
+  p_emails jsonb,
+  p_clear_error boolean DEFAULT false
+)
+RETURNS integer
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  v_updated integer;
+BEGIN
+  UPDATE email_queue q
+  SET
+    status = 'queued',
+    domain_index = u.domain_index,
+    from_email = u.from_email,
+    scheduled_for = u.scheduled_for,
+    error_message = CASE WHEN p_clear_error THEN NULL ELSE q.error_message END
+  FROM jsonb_to_recordset(p_emails)
+    AS u(id uuid, domain_index integer, from_email text, scheduled_for timestamptz)
+  WHERE q.id = u.id;
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$;
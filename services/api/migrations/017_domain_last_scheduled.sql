@@ -0,0 +1,19 @@
+-- Latest scheduled_for per sending domain across all queued / processing
+-- emails, used by the launch and retry tasks to keep domain spacing when
+-- campaigns overlap. One row per domain_index instead of every queued row.
+CREATE INDEX IF NOT EXISTS email_queue_pending_domain_scheduled_for_idx
+  ON email_queue (domain_index, scheduled_for DESC)
+  WHERE status IN ('queued', 'processing') AND scheduled_for IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION get_domain_last_scheduled()
+RETURNS TABLE (domain_index integer, scheduled_for timestamptz)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT DISTINCT ON (q.domain_index) q.domain_index, q.scheduled_for
+  FROM email_queue q
+  WHERE q.status IN ('queued', 'processing')
+    AND q.scheduled_for IS NOT NULL
+    AND q.domain_index IS NOT NULL
+  ORDER BY q.domain_index, q.scheduled_for DESC;
+$$;
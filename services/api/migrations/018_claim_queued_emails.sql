@@ -0,0 +1,15 @@
+-- Claim a batch of queued emails for the campaign runner in one statement:
+-- flips status 'queued' -> 'processing' (the worker's lock) for the given
+-- ids and returns only the ids it actually claimed, so emails taken by
+-- another worker in the meantime are skipped.
+CREATE OR REPLACE FUNCTION claim_queued_emails(p_ids uuid[])
+RETURNS SETOF uuid
+LANGUAGE sql
+VOLATILE
+AS $$
+  UPDATE email_queue
+  SET status = 'processing'
+  WHERE id = ANY(p_ids)
+    AND status = 'queued'
+  RETURNING id;
+$$;
@@ -0,0 +1,4 @@
+-- Recipient lists of any size now go through replace_campaign_recipients
+-- (012) in one transaction; the batched upsert + prune path from 013 could
+-- leave a half-replaced list behind on failure and is no longer used.
+DROP FUNCTION IF EXISTS prune_campaign_recipients(uuid, uuid[]);
@@ -0,0 +1,3 @@
+-- GET /api/v1/campaigns reads sent/failed totals through the email_stats
+-- embed (010); the per-page RPC from 003 has no callers left.
+DROP FUNCTION IF EXISTS campaign_email_status_counts(uuid[]);
@@ -0,0 +1,20 @@
+"""Admin authentication routes."""
+
+from fastapi import APIRouter, Depends
+from middleware.auth import create_admin_token, verify_admin_basic
+
+router = APIRouter()
+
+
+# POST /api/v1/auth/login
+@router.post("/login")
+async def login(admin_user: dict = Depends(verify_admin_basic)):
+    """Exchange Basic credentials for a short-lived bearer token.
+
+    Only Basic credentials are accepted here, checked against admin_users,
+    so an existing token cannot be used to mint a new one. Subsequent
+    requests can send ``Authorization: Bearer <token>``, which is checked by
+    signature alone without a database lookup.
+    """
+    token, expires_at = create_admin_token(admin_user)
+    return {"token": token, "expiresAt": expires_at, "user": admin_user}
@@ -2,29 +2,85 @@
 
 import asyncio
 import logging
+import orjson
+import re
 import sys
 import os
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from functools import lru_cache
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from middleware.auth import verify_admin
-from shared.db import get_supabase_admin
-from shared.scheduling import BASE_DOMAINS, create_date_in_timezone
+from shared.cache import campaign_row_cache, invalidate_campaign_caches, week_schedule_cache
+from shared.db import get_supabase_admin, run_query
+from shared.pagination import apply_keyset, split_page
+from shared.email import replace_variables
+from shared.email_renderer import generate_email_html, generate_email_text
+from shared.email_sender import get_sparkpost_client, send_sparkpost_email
+from shared.prompts import generate_content, groq_client
+from shared.scheduling import BASE_DOMAINS, generate_domain_config
 from tasks.generate import process_generate_task
 from tasks.launch import process_launch_task
 from tasks.retry_failed import process_retry_failed_task
-from config import Config
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Columns read by the list/detail responses; avoids shipping unused fields.
+CAMPAIGN_LIST_COLUMNS = (
+    "id, name, template_slug, sections, subject_line, email_format, status, "
+    "total_recipients, sender, created_at, updated_at, "
+    "email_stats(sent_count, failed_count)"
+)
+CAMPAIGN_DETAIL_COLUMNS = (
+    "id, name, template_slug, sections, subject_line, email_format, status, "
+    "total_recipients, subject_prompt, created_at, updated_at"
+)
+
+# (response key, campaigns column, default) for list_campaigns items
+_LIST_FIELD_MAP = (
+    ("id", "id", None),
+    ("name", "name", None),
+    ("templateSlug", "template_slug", None),
+    ("sections", "sections", []),
+    ("subjectLine", "subject_line", {}),
+    ("emailFormat", "email_format", "html"),
+    ("status", "status", "draft"),
+    ("totalRecipients", "total_recipients", 0),
+    ("sender", "sender", None),
+    ("createdAt", "created_at", None),
+    ("updatedAt", "updated_at", None),
+)
+
+
+def _list_stats(stats: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Map the embedded email_stats row to the list item's sent/failed keys."""
+    if not stats:
+        return {"sent": 0, "failed": 0}
+    return {"sent": stats.get("sent_count", 0), "failed": stats.get("failed_count", 0)}
+
+
+# Domain configuration never changes at runtime
+_DOMAINS_RESPONSE = {
+    "domains": BASE_DOMAINS,
+    "count": len(BASE_DOMAINS),
+}
+
+# Sending capacity for the dashboard schedule; settings are fixed per process
+_WORKING_HOURS = settings.WORKING_HOUR_END - settings.WORKING_HOUR_START
+_DOMAIN_COUNT = len(BASE_DOMAINS)
+_EMAILS_PER_DOMAIN_PER_HOUR = 60 / settings.INTERVAL_MINUTES
+_MAX_DAILY_CAPACITY = int(_WORKING_HOURS * _EMAILS_PER_DOMAIN_PER_HOUR * _DOMAIN_COUNT)
+_DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
 
 class CampaignCreate(BaseModel):
     name: str
@@ -54,11 +110,6 @@ class GenerateRequest(BaseModel):
     use_database_recipients: bool = True
 
 
-class TestSendRequest(BaseModel):
-    testEmail: str
-    recipientEmailId: Optional[str] = None
-
-
 class GenerateSubjectRequest(BaseModel):
     instructions: str
 
@@ -91,7 +142,7 @@ async def check_and_update_completed_campaign(
     """
     try:
         # 1. Get campaign current status
-        campaign_response = supabase.table("campaigns").select("status").eq("id", campaign_id).single().execute()
+        campaign_response = await run_query(supabase.table("campaigns").select("status").eq("id", campaign_id).single())
         
         if not campaign_response.data:
             return False  # Campaign not found
@@ -103,35 +154,31 @@ async def check_and_update_completed_campaign(
         if campaign_status not in ["scheduled", "sending"]:
             return False  # Already completed, paused, cancelled, or not launched
         
-        # 3. Count email statuses efficiently
-        def count_for_status(status: str):
-            response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).eq("status", status).execute()
-            return response.count or 0
-        
-        queued = count_for_status("queued")
-        processing = count_for_status("processing")
-        sent = count_for_status("sent")
-        failed = count_for_status("failed")
+        # 3. Count email statuses and future scheduled emails in one aggregate
+        snapshot_response = await run_query(supabase.rpc(
+            "campaign_completion_snapshot", {"p_campaign_id": campaign_id}
+        ))
+        snapshot = (snapshot_response.data or [{}])[0]
+        queued = snapshot.get("queued_count") or 0
+        processing = snapshot.get("processing_count") or 0
+        sent = snapshot.get("sent_count") or 0
+        failed = snapshot.get("failed_count") or 0
+        future_count = snapshot.get("future_count") or 0
         
-        # 4. Check if there are any future scheduled emails
-        now_iso = datetime.utcnow().isoformat()
-        future_response = supabase.table("email_queue").select("id").eq("campaign_id", campaign_id).in_("status", ["queued", "processing"]).gt("scheduled_for", now_iso).limit(1).execute()
-        future_emails = future_response.data or []
-        
-        # 5. Determine if completed
+        # 4. Determine if completed
         is_completed = (
             queued == 0 and
             processing == 0 and
             (sent + failed) > 0 and  # At least some emails were processed
-            len(future_emails) == 0  # No future scheduled emails
+            future_count == 0  # No future scheduled emails
         )
         
-        # 6. Update status if completed
+        # 5. Update status if completed
         if is_completed:
-            update_response = supabase.table("campaigns").update({
+            update_response = await run_query(supabase.table("campaigns").update({
                 "status": "completed",
-                "updated_at": datetime.utcnow().isoformat(),
-            }).eq("id", campaign_id).eq("status", campaign_status).execute()  # Optimistic locking
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }).eq("id", campaign_id).eq("status", campaign_status))  # Optimistic locking
             
             # Check if update succeeded (optimistic locking prevents race conditions)
             if update_response.data:
@@ -149,14 +196,32 @@ async def check_and_update_completed_campaign(
 
 # GET /api/v1/campaigns
 @router.get("")
-async def list_campaigns(admin_user: dict = Depends(verify_admin)):
-    """List all campaigns."""
+async def list_campaigns(
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    admin_user: dict = Depends(verify_admin)
+):
+    """List campaigns, newest first.
+
+    Without ``limit``/``cursor`` every campaign is returned as a plain list.
+    When either is given the response is one keyset page:
+    ``{"items": [...], "nextCursor": str | None}``.
+    """
     supabase = get_supabase_admin()
     
-    response = supabase.table("campaigns").select("*").order("created_at", desc=True).execute()
+    paginate = limit is not None or cursor is not None
+    query = supabase.table("campaigns").select(CAMPAIGN_LIST_COLUMNS)
+    if paginate:
+        limit = limit or 50
+        query = apply_keyset(query, cursor, "created_at").limit(limit + 1)
+    else:
+        query = query.order("created_at", desc=True)
+    response = await run_query(query)
     
     campaigns = response.data or []
-    campaign_ids = [c["id"] for c in campaigns]
+    next_cursor = None
+    if paginate:
+        campaigns, next_cursor = split_page(campaigns, limit, "created_at")
     
     # Check and update completed campaigns (on-demand check)
     # Only check campaigns that are 'scheduled' or 'sending'
@@ -166,49 +231,30 @@ async def list_campaigns(admin_user: dict = Depends(verify_admin)):
     ]
     
     if active_campaign_ids:
-        # Check all active campaigns in parallel
-        await asyncio.gather(*[
-            check_and_update_completed_campaign(supabase, cid) 
-            for cid in active_campaign_ids
-        ])
+        # Check all active campaigns in one set-based update
+        completed_response = await run_query(supabase.rpc(
+            "mark_completed_campaigns", {"ids": active_campaign_ids}
+        ))
+        completed = {row["id"]: row for row in completed_response.data or []}
         
-        # Re-fetch campaigns to get updated statuses
-        updated_response = supabase.table("campaigns").select("*").in_("id", campaign_ids).order("created_at", desc=True).execute()
-        if updated_response.data:
-            campaigns = updated_response.data
-    
-    # Get email stats for all campaigns using count queries (more efficient and avoids pagination limits)
-    email_stats = {}
-    if campaign_ids:
-        # Use count queries instead of fetching all rows to avoid pagination limits
-        for campaign_id in campaign_ids:
-            sent_response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).eq("status", "sent").execute()
-            failed_response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).eq("status", "failed").execute()
-            email_stats[campaign_id] = {
-                "sent": sent_response.count or 0,
-                "failed": failed_response.count or 0
-            }
+        # Patch updated statuses in place instead of re-fetching every campaign
+        if completed:
+            for campaign in campaigns:
+                row = completed.get(campaign["id"])
+                if row:
+                    logger.info(f"Campaign {row['id']} marked as completed")
+                    campaign["status"] = row["status"]
+                    campaign["updated_at"] = row["updated_at"]
     
     # Format response
-    result = []
-    for campaign in campaigns:
-        stats = email_stats.get(campaign["id"], {"sent": 0, "failed": 0})
-        result.append({
-            "id": campaign["id"],
-            "name": campaign["name"],
-            "templateSlug": campaign.get("template_slug"),
-            "sections": campaign.get("sections", []),
-            "subjectLine": campaign.get("subject_line", {}),
-            "emailFormat": campaign.get("email_format", "html"),
-            "status": campaign.get("status", "draft"),
-            "totalRecipients": campaign.get("total_recipients", 0),
-            "sender": campaign.get("sender"),
-            "sent": stats["sent"],
-            "failed": stats["failed"],
-            "createdAt": campaign.get("created_at"),
-            "updatedAt": campaign.get("updated_at"),
-        })
+    result = [
+        {out: campaign.get(src, default) for out, src, default in _LIST_FIELD_MAP}
+        | _list_stats(campaign.get("email_stats"))
+        for campaign in campaigns
+    ]
     
+    if paginate:
+        return {"items": result, "nextCursor": next_cursor}
     return result
 
 
@@ -227,7 +273,7 @@ async def create_campaign(campaign: CampaignCreate, admin_user: dict = Depends(v
         raise HTTPException(status_code=400, detail="Valid sender is required")
     
     supabase = get_supabase_admin()
-    response = supabase.table("campaigns").insert({
+    response = await run_query(supabase.table("campaigns").insert({
         "name": campaign.name,
         "template_slug": campaign.templateSlug,
         "sections": campaign.sections,
@@ -235,11 +281,13 @@ async def create_campaign(campaign: CampaignCreate, admin_user: dict = Depends(v
         "email_format": campaign.emailFormat,
         "status": "draft",
         "sender": campaign.sender,
-    }).execute()
+    }))
     
     if not response.data or len(response.data) == 0:
         raise HTTPException(status_code=500, detail="Failed to create campaign")
     
+    invalidate_campaign_caches()
+    
     data = response.data[0]
     return {
         "id": data["id"],
@@ -263,31 +311,19 @@ async def get_global_status(admin_user: dict = Depends(verify_admin)):
     """Get global campaign status with 7-day schedule."""
     supabase = get_supabase_admin()
     
-    # Count campaigns by status
-    campaigns_response = supabase.table("campaigns").select("status").execute()
-    campaigns = campaigns_response.data or []
-    
-    status_counts = {}
-    for campaign in campaigns:
-        status = campaign.get("status", "draft")
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    # Count emails by status using count queries (more efficient and avoids pagination limits)
-    def count_emails_by_status(status: str):
-        response = supabase.table("email_queue").select("id", count="exact").eq("status", status).execute()
-        return response.count or 0
-    
+    # Count campaigns and emails by status and build the 7-day schedule concurrently
+    campaigns_response, emails_response, week_schedule = await asyncio.gather(
+        run_query(supabase.rpc("campaign_status_totals", {})),
+        run_query(supabase.rpc("email_status_totals", {})),
+        _build_week_schedule(supabase),
+    )
+    status_counts = {row["status"]: row["count"] for row in campaigns_response.data or []}
+    email_totals = {row["status"]: row["count"] for row in emails_response.data or []}
     email_status_counts = {
-        "staged": count_emails_by_status("staged"),
-        "queued": count_emails_by_status("queued"),
-        "processing": count_emails_by_status("processing"),
-        "sent": count_emails_by_status("sent"),
-        "failed": count_emails_by_status("failed"),
+        status: email_totals.get(status, 0)
+        for status in ("staged", "queued", "processing", "sent", "failed")
     }
     
-    # Build 7-day schedule
-    week_schedule = await _build_week_schedule(supabase)
-    
     return {
         "campaigns": status_counts,
         "emails": email_status_counts,
@@ -298,82 +334,65 @@ async def get_global_status(admin_user: dict = Depends(verify_admin)):
 async def _build_week_schedule(supabase) -> List[Dict[str, Any]]:
     """Build the 7-day schedule showing queued emails per day."""
     # Configuration
-    TIMEZONE = Config.TIMEZONE
-    WORKING_HOUR_START = Config.WORKING_HOUR_START
-    WORKING_HOUR_END = Config.WORKING_HOUR_END
-    WORKING_HOURS = WORKING_HOUR_END - WORKING_HOUR_START
-    INTERVAL_MINUTES = Config.INTERVAL_MINUTES
-    DOMAIN_COUNT = len(BASE_DOMAINS)
-    
-    # Calculate capacity
-    emails_per_domain_per_hour = 60 / INTERVAL_MINUTES
-    MAX_DAILY_CAPACITY = int(WORKING_HOURS * emails_per_domain_per_hour * DOMAIN_COUNT)
+    TIMEZONE = settings.TIMEZONE
+    WORKING_HOUR_START = settings.WORKING_HOUR_START
+    WORKING_HOUR_END = settings.WORKING_HOUR_END
     
     # Get current time in configured timezone
-    now_utc = datetime.now(ZoneInfo("UTC"))
     tz = ZoneInfo(TIMEZONE)
-    now_zoned = now_utc.astimezone(tz)
+    now_zoned = datetime.now(tz)
     
-    year = now_zoned.year
-    month = now_zoned.month
-    day = now_zoned.day
-    hour = now_zoned.hour
+    cache_key = (TIMEZONE, now_zoned.strftime("%Y%m%d%H"))
+    cached = week_schedule_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Day names
-    day_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    hour = now_zoned.hour
+    today_midnight = datetime(now_zoned.year, now_zoned.month, now_zoned.day, tzinfo=tz)
     
     week_schedule = []
     DAYS_TO_SHOW = 7
     
+    # Count queued/sent emails for every day in the window with one aggregate
+    window_start = today_midnight.astimezone(timezone.utc)
+    window_end = (today_midnight + timedelta(days=DAYS_TO_SHOW)).astimezone(timezone.utc)
+    schedule_response = await run_query(supabase.rpc("week_schedule", {
+        "p_tz": TIMEZONE,
+        "p_start_utc": window_start.isoformat(),
+        "p_end_utc": window_end.isoformat(),
+    }))
+    day_counts = {row["day"]: row for row in schedule_response.data or []}
+    
     for day_offset in range(DAYS_TO_SHOW):
         # Calculate the date for this day
-        day_date = datetime(year, month, day, tzinfo=tz) + timedelta(days=day_offset)
-        
-        # Create day boundaries in timezone, then convert to UTC for queries
-        day_start = create_date_in_timezone(
-            TIMEZONE,
-            day_date.year,
-            day_date.month,
-            day_date.day,
-            0, 0, 0
-        )
-        day_end = create_date_in_timezone(
-            TIMEZONE,
-            day_date.year,
-            day_date.month,
-            day_date.day,
-            23, 59, 59
-        )
+        day_date = today_midnight + timedelta(days=day_offset)
+        date_str = day_date.date().isoformat()
+        counts = day_counts.get(date_str, {})
         
-        # Count emails queued for this day
-        queued_response = supabase.table("email_queue").select("id", count="exact").eq("status", "queued").gte("scheduled_for", day_start.isoformat()).lt("scheduled_for", day_end.isoformat()).execute()
-        queued_count = queued_response.count or 0
+        # Emails queued for this day
+        queued_count = counts.get("queued_count") or 0
         
-        # Count emails sent on this day (only for today)
-        sent_count = 0
-        if day_offset == 0:
-            sent_response = supabase.table("email_queue").select("id", count="exact").eq("status", "sent").gte("sent_at", day_start.isoformat()).lt("sent_at", day_end.isoformat()).execute()
-            sent_count = sent_response.count or 0
+        # Emails sent on this day (only for today)
+        sent_count = (counts.get("sent_count") or 0) if day_offset == 0 else 0
         
         # Calculate capacity for this day
-        day_capacity = MAX_DAILY_CAPACITY
+        day_capacity = _MAX_DAILY_CAPACITY
         remaining_hours = None
         
         if day_offset == 0:
             # Today - calculate based on current hour
             if hour < WORKING_HOUR_START:
-                day_capacity = MAX_DAILY_CAPACITY
-                remaining_hours = WORKING_HOURS
+                day_capacity = _MAX_DAILY_CAPACITY
+                remaining_hours = _WORKING_HOURS
             elif hour >= WORKING_HOUR_END:
                 day_capacity = 0
                 remaining_hours = 0
             else:
                 remaining_hours = WORKING_HOUR_END - hour
-                day_capacity = int(remaining_hours * emails_per_domain_per_hour * DOMAIN_COUNT)
+                day_capacity = int(remaining_hours * _EMAILS_PER_DOMAIN_PER_HOUR * _DOMAIN_COUNT)
         
         # Format date for display
-        date_str = f"{day_date.year}-{str(day_date.month).zfill(2)}-{str(day_date.day).zfill(2)}"
-        day_of_week = day_names[day_date.weekday()]
+        day_of_week = _DAY_NAMES[day_date.weekday()]
         
         # Create day label
         if day_offset == 0:
@@ -397,6 +416,7 @@ async def _build_week_schedule(supabase) -> List[Dict[str, Any]]:
             "isToday": day_offset == 0,
         })
     
+    week_schedule_cache[cache_key] = week_schedule
     return week_schedule
 
 
@@ -405,16 +425,7 @@ async def _build_week_schedule(supabase) -> List[Dict[str, Any]]:
 @router.get("/domains")
 async def get_domains(admin_user: dict = Depends(verify_admin)):
     """Get domain configuration."""
-    import sys
-    import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    
-    from shared.scheduling import BASE_DOMAINS
-    
-    return {
-        "domains": BASE_DOMAINS,
-        "count": len(BASE_DOMAINS),
-    }
+    return _DOMAINS_RESPONSE
 
 
 # GET /api/v1/campaigns/{campaign_id}
@@ -426,7 +437,7 @@ async def get_campaign(campaign_id: str, admin_user: dict = Depends(verify_admin
     # Check and update campaign completion status (on-demand check)
     await check_and_update_completed_campaign(supabase, campaign_id)
     
-    response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    response = await run_query(supabase.table("campaigns").select(CAMPAIGN_DETAIL_COLUMNS).eq("id", campaign_id).single())
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
@@ -466,9 +477,9 @@ async def update_campaign(
     
     # If status is being changed to 'draft', delete all staged emails
     if campaign.status == "draft":
-        supabase.table("email_queue").delete().eq("campaign_id", campaign_id).eq("status", "staged").execute()
+        await run_query(supabase.table("email_queue").delete().eq("campaign_id", campaign_id).eq("status", "staged"))
     
-    updates = {"updated_at": datetime.utcnow().isoformat()}
+    updates = {"updated_at": datetime.now(timezone.utc).isoformat()}
     if campaign.name is not None:
         updates["name"] = campaign.name
     if campaign.templateSlug is not None:
@@ -486,11 +497,18 @@ async def update_campaign(
         if campaign.status == "draft":
             updates["total_recipients"] = 0
     
-    response = supabase.table("campaigns").update(updates).eq("id", campaign_id).execute()
+    response = await run_query(supabase.table("campaigns").update(updates).eq("id", campaign_id))
     
     if not response.data or len(response.data) == 0:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
+    if campaign.status is not None:
+        invalidate_campaign_caches()
+    else:
+        # Edits to sections, subject, name or format must reach the next
+        # /test-send or /generate-subject in this process straight away
+        campaign_row_cache.pop(campaign_id, None)
+    
     data = response.data[0]
     return {
         "id": data["id"],
@@ -513,10 +531,12 @@ async def delete_campaign(campaign_id: str, admin_user: dict = Depends(verify_ad
     supabase = get_supabase_admin()
     
     # Delete associated emails first
-    supabase.table("email_queue").delete().eq("campaign_id", campaign_id).execute()
+    await run_query(supabase.table("email_queue").delete().eq("campaign_id", campaign_id))
     
     # Delete campaign
-    response = supabase.table("campaigns").delete().eq("id", campaign_id).execute()
+    response = await run_query(supabase.table("campaigns").delete().eq("id", campaign_id))
+    
+    invalidate_campaign_caches()
     
     return {"success": True}
 
@@ -529,8 +549,6 @@ async def preview_generate(
     admin_user: dict = Depends(verify_admin)
 ):
     """Generate preview content for email sections."""
-    from shared.prompts import generate_content
-    
     # Validation
     if not request.sections or not isinstance(request.sections, list):
         raise HTTPException(status_code=400, detail="Invalid sections data")
@@ -572,7 +590,7 @@ async def generate_emails(
     supabase = get_supabase_admin()
     
     # Verify campaign exists
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
     if not campaign_response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
@@ -604,7 +622,7 @@ async def launch_campaign(
     supabase = get_supabase_admin()
     
     # Verify campaign
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
     if not campaign_response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
@@ -635,7 +653,7 @@ async def retry_failed(
     supabase = get_supabase_admin()
     
     # Verify campaign
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
     if not campaign_response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
@@ -655,18 +673,18 @@ async def get_campaign_status(campaign_id: str, admin_user: dict = Depends(verif
     supabase = get_supabase_admin()
     
     # Get campaign
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
     if not campaign_response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     campaign = campaign_response.data
     
-    # Count staged emails (scheduled_for IS NULL)
-    staged_response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).is_("scheduled_for", "null").execute()
+    # Count staged (scheduled_for IS NULL) and queued (IS NOT NULL) emails concurrently
+    staged_response, queued_response = await asyncio.gather(
+        run_query(supabase.table("email_queue").select("id", count="exact", head=True).eq("campaign_id", campaign_id).is_("scheduled_for", "null")),
+        run_query(supabase.table("email_queue").select("id", count="exact", head=True).eq("campaign_id", campaign_id).not_.is_("scheduled_for", "null")),
+    )
     staged_count = staged_response.count or 0
-    
-    # Count queued emails (scheduled_for IS NOT NULL)
-    queued_response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).not_.is_("scheduled_for", "null").execute()
     queued_count = queued_response.count or 0
     
     # Total recipients
@@ -697,30 +715,22 @@ async def get_campaign_summary(campaign_id: str, admin_user: dict = Depends(veri
     await check_and_update_completed_campaign(supabase, campaign_id)
     
     # Get campaign
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+    campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
     if not campaign_response.data:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     campaign = campaign_response.data
     
-    # Count emails by status
-    def count_for_status(status: str):
-        response = supabase.table("email_queue").select("id", count="exact").eq("campaign_id", campaign_id).eq("status", status).execute()
-        return response.count or 0
-    
-    sent = count_for_status("sent")
-    failed = count_for_status("failed")
-    queued = count_for_status("queued")
-    processing = count_for_status("processing")
-    staged = count_for_status("staged")
-    
-    # Get last sent
-    last_sent_response = supabase.table("email_queue").select("sent_at").eq("campaign_id", campaign_id).eq("status", "sent").order("sent_at", desc=True).limit(1).execute()
-    last_sent_at = last_sent_response.data[0]["sent_at"] if last_sent_response.data and len(last_sent_response.data) > 0 else None
-
-    # Get next scheduled
-    next_scheduled_response = supabase.table("email_queue").select("scheduled_for").eq("campaign_id", campaign_id).eq("status", "queued").order("scheduled_for", desc=False).limit(1).execute()
-    next_scheduled_for = next_scheduled_response.data[0]["scheduled_for"] if next_scheduled_response.data and len(next_scheduled_response.data) > 0 else None
+    # Count emails by status and get last sent / next scheduled in one aggregate
+    summary_response = await run_query(supabase.rpc("campaign_summary", {"p_id": campaign_id}))
+    summary = (summary_response.data or [{}])[0]
+    sent = summary.get("sent_count") or 0
+    failed = summary.get("failed_count") or 0
+    queued = summary.get("queued_count") or 0
+    processing = summary.get("processing_count") or 0
+    staged = summary.get("staged_count") or 0
+    last_sent_at = summary.get("last_sent_at")
+    next_scheduled_for = summary.get("next_scheduled_for")
     
     # SparkPost metrics
     sparkpost_metrics = {
@@ -732,11 +742,8 @@ async def get_campaign_summary(campaign_id: str, admin_user: dict = Depends(veri
         "countUnsubscribed": None,
     }
 
-    if Config.SPARKPOST_API_KEY and sent > 0:
+    if settings.SPARKPOST_API_KEY and sent > 0:
         try:
-            import httpx
-            import re
-
             # Construct SparkPost campaign_id (same logic as in email_sender.py)
             campaign_name = campaign.get("name", "")
             if campaign_name:
@@ -749,7 +756,7 @@ async def get_campaign_summary(campaign_id: str, admin_user: dict = Depends(veri
                 sparkpost_campaign_id = campaign_id
 
             # Fetch metrics from SparkPost API
-            metrics_url = "https://api.sparkpost.com/api/v1/metrics/deliverability"
+            metrics_url = "/api/v1/metrics/deliverability"
 
             # Use campaign creation date as start, and 30 days after as end (or current time if campaign is still active)
             campaign_created_at = campaign.get("created_at")
@@ -777,42 +784,34 @@ async def get_campaign_summary(campaign_id: str, admin_user: dict = Depends(veri
                 "to": to_date.strftime("%Y-%m-%dT%H:%M"),
             }
 
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(
-                    metrics_url,
-                    params=params,
-                    headers={
-                        "Authorization": Config.SPARKPOST_API_KEY,
-                        "Content-Type": "application/json",
-                    },
-                )
-
-                if response.is_success:
-                    data = response.json()
-                    results = data.get("results", [])
-
-                    if results:
-                        # Aggregate metrics across all results (excluding unsubscribe data)
-                        total_delivered = sum(r.get("count_delivered", 0) for r in results)
-                        total_bounced = sum(r.get("count_bounce", 0) for r in results)
-                        total_injected = sum(r.get("count_injected", 0) for r in results)
-
-                        # Calculate delivery and bounce rates (unchanged)
-                        if total_injected > 0:
-                            delivery_rate = (total_delivered / total_injected) * 100
-                            bounce_rate = (total_bounced / total_injected) * 100
-
-                            sparkpost_metrics["deliveryRate"] = round(delivery_rate, 1)
-                            sparkpost_metrics["bounceRate"] = round(bounce_rate, 1)
-                            sparkpost_metrics["countDelivered"] = total_delivered
-                            sparkpost_metrics["countBounced"] = total_bounced
+            response = await get_sparkpost_client().get(metrics_url, params=params)
+
+            if response.is_success:
+                data = orjson.loads(response.content)
+                results = data.get("results", [])
+
+                if results:
+                    # Aggregate metrics across all results (excluding unsubscribe data)
+                    total_delivered = sum(r.get("count_delivered", 0) for r in results)
+                    total_bounced = sum(r.get("count_bounce", 0) for r in results)
+                    total_injected = sum(r.get("count_injected", 0) for r in results)
+
+                    # Calculate delivery and bounce rates (unchanged)
+                    if total_injected > 0:
+                        delivery_rate = (total_delivered / total_injected) * 100
+                        bounce_rate = (total_bounced / total_injected) * 100
+
+                        sparkpost_metrics["deliveryRate"] = round(delivery_rate, 1)
+                        sparkpost_metrics["bounceRate"] = round(bounce_rate, 1)
+                        sparkpost_metrics["countDelivered"] = total_delivered
+                        sparkpost_metrics["countBounced"] = total_bounced
         except Exception as e:
             logger.warning(f"Failed to fetch SparkPost metrics for campaign {campaign_id}: {e}")
             pass
 
     # Get unsubscribe count from database (campaign_recipients table)
     try:
-        unsubscribe_response = supabase.table("campaign_recipients").select("id", count="exact").eq("campaign_id", campaign_id).not_.is_("unsubscribed_at", "null").execute()
+        unsubscribe_response = await run_query(supabase.table("campaign_recipients").select("id", count="exact", head=True).eq("campaign_id", campaign_id).not_.is_("unsubscribed_at", "null"))
         db_unsubscribe_count = unsubscribe_response.count or 0
 
         # Update metrics with database unsubscribe data
@@ -849,6 +848,24 @@ async def get_campaign_summary(campaign_id: str, admin_user: dict = Depends(veri
     }
 
 
+@lru_cache(maxsize=16)
+def _test_send_from_email(sender: str) -> str:
+    """Return the From header for test sends: the sender on the first domain."""
+    domain_config = generate_domain_config(sender)[0]
+    return f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>"
+
+
+async def _get_campaign_row(supabase, campaign_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a full campaign row, served from ``campaign_row_cache`` when fresh."""
+    campaign = campaign_row_cache.get(campaign_id)
+    if campaign is None:
+        campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
+        campaign = campaign_response.data
+        if campaign:
+            campaign_row_cache[campaign_id] = campaign
+    return campaign
+
+
 # POST /api/v1/campaigns/{campaign_id}/test-send
 @router.post("/{campaign_id}/test-send")
 async def test_send(
@@ -857,29 +874,17 @@ async def test_send(
     admin_user: dict = Depends(verify_admin)
 ):
     """Send a test email."""
-    import sys
-    import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    
-    from shared.email_renderer import generate_email_html, generate_email_text
-    from shared.prompts import generate_content
-    from shared.email_sender import send_sparkpost_email
-    from shared.scheduling import generate_domain_config
-    from shared.email import replace_variables
-    
     supabase = get_supabase_admin()
     
     # Get campaign
-    campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
-    if not campaign_response.data:
+    campaign = await _get_campaign_row(supabase, campaign_id)
+    if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
-    campaign = campaign_response.data
-    
     # Get recipient data if recipientEmailId is provided
     recipient_data = {}
     if request.recipientEmailId:
-        email_response = supabase.table("email_queue").select("*").eq("id", request.recipientEmailId).eq("campaign_id", campaign_id).single().execute()
+        email_response = await run_query(supabase.table("email_queue").select("*").eq("id", request.recipientEmailId).eq("campaign_id", campaign_id).single())
         if email_response.data:
             recipient_data = email_response.data.get("metadata", {})
     
@@ -903,10 +908,7 @@ async def test_send(
     else:
         body = generate_email_html(sections, subject_line, recipient_data, generated_content, campaign_id=campaign_id)
     
-    # Get domain config
-    DOMAIN_CONFIG = generate_domain_config(campaign.get("sender", "jeff_richmond"))
-    domain_config = DOMAIN_CONFIG[0]
-    from_email = f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>"
+    from_email = _test_send_from_email(campaign.get("sender", "jeff_richmond"))
     
     # Replace variables in subject
     subject = replace_variables(subject_line, recipient_data)
@@ -935,26 +937,16 @@ async def generate_subject(
     admin_user: dict = Depends(verify_admin)
 ):
     """Generate a subject line using AI."""
-    import sys
-    import os
-    import json
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    
-    from groq import Groq
-    from config import Config
-    
     if not request.instructions or not request.instructions.strip():
         raise HTTPException(status_code=400, detail="Instructions are required")
     
     supabase = get_supabase_admin()
     
     # Get campaign
-    campaign_response = supabase.table("campaigns").select("name, sections").eq("id", campaign_id).single().execute()
-    if not campaign_response.data:
+    campaign = await _get_campaign_row(supabase, campaign_id)
+    if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
-    campaign = campaign_response.data
-    
     # Extract email content from sections
     sections = campaign.get("sections", [])
     email_content_parts = []
@@ -979,9 +971,6 @@ EMAIL CONTENT CONTEXT:
 {email_content}
 """
     
-    # Generate using Groq
-    groq_client = Groq(api_key=Config.GROQ_API_KEY)
-    
     SubjectResponseSchema = {
         "type": "object",
         "properties": {
@@ -994,7 +983,10 @@ EMAIL CONTENT CONTEXT:
         "additionalProperties": False,
     }
     
-    response = groq_client.chat.completions.create(
+    # Generate using the shared Groq client; the SDK call is blocking, so keep
+    # it off the event loop while the model runs
+    response = await asyncio.to_thread(
+        groq_client.chat.completions.create,
         model="moonshotai/kimi-k2-instruct-0905",
         messages=[{"role": "user", "content": prompt}],
         response_format={
@@ -1010,18 +1002,18 @@ EMAIL CONTENT CONTEXT:
     if not response_content:
         raise HTTPException(status_code=500, detail="Empty response from AI")
     
-    import json
-    response_data = json.loads(response_content)
+    response_data = orjson.loads(response_content)
     
     if not response_data.get("subject"):
         raise HTTPException(status_code=500, detail="Invalid response structure from AI")
     
     # Persist the prompt (best-effort)
     try:
-        supabase.table("campaigns").update({
+        await run_query(supabase.table("campaigns").update({
             "subject_prompt": request.instructions,
-            "updated_at": datetime.utcnow().isoformat(),
-        }).eq("id", campaign_id).execute()
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", campaign_id))
+        campaign_row_cache.pop(campaign_id, None)
     except Exception:
         pass
     
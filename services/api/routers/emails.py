@@ -3,10 +3,19 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional, List, Dict, Any
 from middleware.auth import verify_admin
-from shared.db import get_supabase_admin
+from shared.db import get_supabase_admin, run_query
+from shared.pagination import apply_keyset, split_page
 
 router = APIRouter()
 
+# Columns read by transform_email_to_camelcase, minus the (large) body, which
+# list views can skip with include_body=false and fetch on demand via
+# GET .../emails/{email_id}/body
+EMAIL_LIST_COLUMNS = (
+    "id,campaign_id,to_email,from_email,subject,status,scheduled_for,"
+    "domain_index,is_edited,metadata,created_at,error_message,sent_at"
+)
+
 
 def transform_email_to_camelcase(email: Dict[str, Any]) -> Dict[str, Any]:
     """Transform email from snake_case database fields to camelCase frontend format."""
@@ -35,17 +44,35 @@ async def list_emails(
     status: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_body: bool = True,
     admin_user: dict = Depends(verify_admin)
 ):
-    """List emails for a campaign."""
+    """List emails for a campaign, newest first.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset paging on
+    ``(created_at, id)`` and returns ``{"items": [...], "nextCursor": ...}``.
+    Without it the legacy ``offset`` paging and bare list are kept.
+    ``include_body=false`` leaves ``body`` null for a lighter listing.
+    """
     supabase = get_supabase_admin()
     
-    query = supabase.table("email_queue").select("*").eq("campaign_id", campaign_id)
+    columns = EMAIL_LIST_COLUMNS + ",body" if include_body else EMAIL_LIST_COLUMNS
+    query = supabase.table("email_queue").select(columns).eq("campaign_id", campaign_id)
     if status:
         query = query.eq("status", status)
     
+    if cursor is not None:
+        query = apply_keyset(query, cursor, "created_at").limit(limit + 1)
+        response = await run_query(query)
+        emails, next_cursor = split_page(response.data or [], limit, "created_at")
+        return {
+            "items": [transform_email_to_camelcase(email) for email in emails],
+            "nextCursor": next_cursor,
+        }
+    
     query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
-    response = query.execute()
+    response = await run_query(query)
     
     emails = response.data or []
     
@@ -70,6 +97,23 @@ async def get_email(
     return transform_email_to_camelcase(response.data)
 
 
+# GET /api/v1/campaigns/{campaign_id}/emails/{email_id}/body
+@router.get("/{campaign_id}/emails/{email_id}/body")
+async def get_email_body(
+    campaign_id: str,
+    email_id: str,
+    admin_user: dict = Depends(verify_admin)
+):
+    """Get just the body of a single email."""
+    supabase = get_supabase_admin()
+    response = await run_query(supabase.table("email_queue").select("id,body").eq("id", email_id).eq("campaign_id", campaign_id).maybe_single())
+    
+    if not response or not response.data:
+        raise HTTPException(status_code=404, detail="Email not found")
+    
+    return {"id": str(response.data["id"]), "body": response.data.get("body")}
+
+
 # PUT /api/v1/campaigns/{campaign_id}/emails/{email_id}
 @router.put("/{campaign_id}/emails/{email_id}")
 async def update_email(
@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 from middleware.auth import verify_admin
-from shared.db import get_supabase_admin
+from shared.db import get_supabase_admin, run_query
 
 router = APIRouter()
 
@@ -34,35 +34,25 @@ async def add_recipients(
     request: RecipientAdd,
     admin_user: dict = Depends(verify_admin)
 ):
-    """Add recipients to a campaign."""
+    """Replace a campaign's recipients with the given contacts.
+
+    Runs as a single RPC (migrations/012) that upserts the new set, prunes
+    contacts no longer selected and updates ``total_recipients`` atomically,
+    whatever the list size, so a failure never leaves a half-replaced list.
+    """
     supabase = get_supabase_admin()
     
-    # Verify campaign exists
-    campaign_response = supabase.table("campaigns").select("id").eq("id", campaign_id).single().execute()
-    if not campaign_response.data:
-        raise HTTPException(status_code=404, detail="Campaign not found")
-    
-    # Prepare recipient rows
-    recipients = []
+    # Prepare recipient rows, one per contact
     selected_emails = request.selected_emails or {}
-
-    for contact_id in request.contact_ids:
-        recipients.append({
-            "campaign_id": campaign_id,
-            "contact_id": contact_id,
-            "selected_email": selected_emails.get(contact_id),
-        })
-
-    # Replace existing recipients for this campaign
-    supabase.table("campaign_recipients").delete().eq("campaign_id", campaign_id).execute()
-
-    # Insert new recipients
-    supabase.table("campaign_recipients").insert(recipients).execute()
-
-    # Update campaign total_recipients count
-    supabase.table("campaigns").update({
-        "total_recipients": len(recipients)
-    }).eq("id", campaign_id).execute()
-
-    return {"success": True, "count": len(recipients)}
-
+    recipients = [
+        {"contact_id": contact_id, "selected_email": selected_emails.get(contact_id)}
+        for contact_id in dict.fromkeys(request.contact_ids)
+    ]
+
+    response = await run_query(supabase.rpc("replace_campaign_recipients", {
+        "p_campaign_id": campaign_id,
+        "p_recipients": recipients,
+    }))
+    if response.data is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return {"success": True, "count": response.data}
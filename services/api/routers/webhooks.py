@@ -1,10 +1,67 @@
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from collections import defaultdict
 from typing import List
+from uuid import UUID
+import asyncio
 import logging
-from shared.webhook_processor import record_bounce, record_unsubscribe, record_spam_complaint, record_delivered
+import orjson
+from config import settings
+from shared.webhook_processor import record_delivered, record_suppression_events
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+logger.setLevel(getattr(logging, settings.WEBHOOK_LOG_LEVEL, logging.INFO))
+
+# Email events that carry a recipient address; SMS events use sms_dst instead
+_RECIPIENT_EVENTS = frozenset({
+    'bounce', 'unsubscribe', 'link_unsubscribe', 'list_unsubscribe',
+    'spam_complaint', 'delivery', 'click', 'open', 'initial_open',
+})
+# Email events that can only be attributed with a campaign_id
+_CAMPAIGN_EVENTS = frozenset({
+    'bounce', 'unsubscribe', 'spam_complaint', 'delivery', 'click', 'open', 'initial_open',
+})
+# Event types that suppress the recipient, applied together in one RPC per
+# webhook batch, with the suppression reason each records
+_SUPPRESSION_REASONS = {
+    'bounce': 'bounce',
+    # Both link clicks and email client unsubscribe buttons
+    'link_unsubscribe': 'unsubscribe',
+    'list_unsubscribe': 'unsubscribe',
+    'spam_complaint': 'spam_complaint',
+}
+# Other event types with a handler; anything else is acknowledged only
+_EVENT_HANDLERS = {
+    'delivery': record_delivered,
+}
+# Upper bound on handler coroutines (and so DB round-trips) in flight per batch
+_HANDLER_CONCURRENCY = 16
+
+
+async def _run_recipient_events(jobs: list, semaphore: asyncio.Semaphore) -> int:
+    """Run one recipient's handlers in arrival order; return the error count."""
+    errors = 0
+    for handler, event_type, campaign_id, recipient, event_data in jobs:
+        try:
+            async with semaphore:
+                await handler(campaign_id, recipient, event_data)
+        except Exception:
+            # Log error but continue processing other events
+            logger.exception("Error processing %s event", event_type)
+            errors += 1
+    return errors
+
+
+def _is_uuid(value: str) -> bool:
+    """Whether a campaign_id can be passed to the suppression RPC as a uuid."""
+    try:
+        UUID(value)
+    except ValueError:
+        return False
+    return True
+
 
 # Commenting out strict Pydantic models to accept raw payloads for debugging
 # class SparkPostEvent(BaseModel):
@@ -24,7 +81,7 @@ async def sparkpost_webhook(request: Request):
 
     try:
         # Get raw payload
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
 
         # Uncomment and fix processing logic now that we know the payload format
         # Verify webhook signature (if configured)
@@ -32,6 +89,11 @@ async def sparkpost_webhook(request: Request):
 
         processed = 0
         errors = 0
+        # Handler calls grouped by recipient so each recipient's events stay ordered
+        jobs_by_recipient = defaultdict(list)
+        job_count = 0
+        # (campaign_id, recipient, reason) in arrival order
+        suppressions = []
 
         # SparkPost sends an array of events
         if isinstance(payload, list):
@@ -53,23 +115,22 @@ async def sparkpost_webhook(request: Request):
                     elif 'unsubscribe_event' in msys_data:
                         event_data = msys_data['unsubscribe_event']
                     else:
-                        logging.warning(f"Unknown event structure: {event_wrapper}")
+                        logger.warning("Unknown event structure: %s", event_wrapper)
                         errors += 1
                         continue
 
                     # Extract event type
                     event_type = event_data.get('type')
                     if not event_type:
-                        logging.warning(f"No type field in event: {event_data}")
+                        logger.warning("No type field in event: %s", event_data)
                         errors += 1
                         continue
 
-                    # Log event type received
-                    print(f"📧 Event type received: {event_type}")
+                    logger.debug("Event type received: %s", event_type)
 
                     # Extract recipient email (handle different event types)
                     recipient = None
-                    if event_type in ['bounce', 'unsubscribe', 'link_unsubscribe', 'list_unsubscribe', 'spam_complaint', 'delivery', 'click', 'open', 'initial_open']:
+                    if event_type in _RECIPIENT_EVENTS:
                         # Email events
                         recipient = event_data.get('rcpt_to') or event_data.get('raw_rcpt_to')
                     elif event_type == 'sms_status':
@@ -78,7 +139,7 @@ async def sparkpost_webhook(request: Request):
                     # Other events might not need recipients (like injection, delay, etc.)
 
                     # Skip events that require recipients but don't have them
-                    if event_type in ['bounce', 'unsubscribe', 'link_unsubscribe', 'list_unsubscribe', 'spam_complaint', 'delivery', 'click', 'open', 'initial_open'] and not recipient:
+                    if event_type in _RECIPIENT_EVENTS and not recipient:
                         errors += 1
                         continue
 
@@ -87,45 +148,63 @@ async def sparkpost_webhook(request: Request):
 
                     # Parse campaign_id to extract UUID if it's in "name - uuid" format
                     if campaign_id and " - " in campaign_id:
-                        # Split on " - " and take the last part (the UUID)
-                        campaign_id = campaign_id.split(" - ")[-1]
+                        # Take the part after the last " - " (the UUID)
+                        campaign_id = campaign_id.rpartition(" - ")[2]
 
                     # For events that need campaign_id (bounces, unsubscribes, etc.)
-                    email_events_requiring_campaign = ['bounce', 'unsubscribe', 'spam_complaint', 'delivery', 'click', 'open', 'initial_open']
-                    if event_type in email_events_requiring_campaign and not campaign_id:
+                    if event_type in _CAMPAIGN_EVENTS and not campaign_id:
                         errors += 1
                         continue
 
-                    # Process based on event type
-                    try:
-                        if event_type == "bounce":
-                            print(f"🔍 Processing bounce: campaign_id={campaign_id}, recipient={recipient}")
-                            await record_bounce(campaign_id, recipient, event_data)
-                        elif event_type in ["link_unsubscribe", "list_unsubscribe"]:
-                            # Handle both link clicks and email client unsubscribe buttons
-                            await record_unsubscribe(campaign_id, recipient, event_data)
-                        elif event_type == "spam_complaint":
-                            await record_spam_complaint(campaign_id, recipient, event_data)
-                        elif event_type == "delivery":
-                            await record_delivered(campaign_id, recipient, event_data)
-                        else:
-                            # Event type received but not processed
-                            pass
+                    reason = _SUPPRESSION_REASONS.get(event_type)
+                    if reason is not None:
+                        # Without a usable campaign the contact is still suppressed globally
+                        if campaign_id is not None and not _is_uuid(campaign_id):
+                            logger.warning("Invalid campaign_id on %s event: %s", event_type, campaign_id)
+                            campaign_id = None
+                        logger.debug("Processing %s: campaign_id=%s, recipient=%s", event_type, campaign_id, recipient)
+                        suppressions.append((campaign_id, recipient, reason))
+                        continue
 
+                    # Queue the handler; other event types are just acknowledged
+                    handler = _EVENT_HANDLERS.get(event_type)
+                    if handler is None:
                         processed += 1
-                    except Exception as e:
-                        # Log error but continue processing other events
-                        print(f"❌ Error processing {event_type}: {e}")
-                        errors += 1
-                        continue
+                    else:
+                        logger.debug("Processing %s: campaign_id=%s, recipient=%s", event_type, campaign_id, recipient)
+                        jobs_by_recipient[recipient].append(
+                            (handler, event_type, campaign_id, recipient, event_data)
+                        )
+                        job_count += 1
 
                 else:
                     errors += 1
 
-            except Exception as e:
-                print(f"❌ Error processing event: {e}")
+            except Exception:
+                logger.exception("Error processing event")
                 errors += 1
 
+        if suppressions:
+            if await record_suppression_events(suppressions) is None:
+                # Not acknowledged, so SparkPost redelivers the batch rather
+                # than the suppressions being lost (they are safe to reapply)
+                return ORJSONResponse(
+                    status_code=503,
+                    content={
+                        "status": "error",
+                        "message": f"Failed to record {len(suppressions)} suppression events",
+                    },
+                )
+            processed += len(suppressions)
+
+        if jobs_by_recipient:
+            semaphore = asyncio.Semaphore(_HANDLER_CONCURRENCY)
+            job_errors = sum(await asyncio.gather(*(
+                _run_recipient_events(jobs, semaphore) for jobs in jobs_by_recipient.values()
+            )))
+            processed += job_count - job_errors
+            errors += job_errors
+
         return {
             "status": "processed",
             "events_processed": processed,
@@ -133,7 +212,7 @@ async def sparkpost_webhook(request: Request):
         }
 
     except Exception as e:
-        print(f"❌ Webhook error: {e}")
+        logger.exception("Webhook error")
         return {
             "status": "error",
             "message": f"Failed to process webhook: {str(e)}"
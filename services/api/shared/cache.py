@@ -0,0 +1,24 @@
+"""In-process caches for dashboard aggregates.
+
+These caches are per process. Invalidation only reaches the worker that
+handled the mutation; with several uvicorn workers (WEB_CONCURRENCY > 1) the
+others can serve a stale entry until its TTL expires, so TTLs here must stay
+short enough for that to be acceptable.
+"""
+
+from cachetools import TTLCache
+
+# 7-day schedule for GET /campaigns/status, keyed by (timezone, local hour).
+# Dashboards poll this endpoint; the schedule only moves when emails are
+# staged, queued or sent, so a short TTL plus explicit invalidation suffices.
+week_schedule_cache: TTLCache = TTLCache(maxsize=16, ttl=60)
+
+# Full campaign rows for /test-send and /generate-subject, keyed by campaign
+# id. Editors fire these in quick succession while the row rarely changes.
+campaign_row_cache: TTLCache = TTLCache(maxsize=512, ttl=5)
+
+
+def invalidate_campaign_caches() -> None:
+    """Drop cached aggregates and rows after campaigns or their emails change."""
+    week_schedule_cache.clear()
+    campaign_row_cache.clear()
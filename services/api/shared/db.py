@@ -1,13 +1,56 @@
 """Database operations for API service."""
 
+import asyncio
+from functools import lru_cache
+
+import httpx
 from supabase import Client, create_client
-from config import Config
+from supabase.lib.client_options import SyncClientOptions
+from config import settings
+
+# Matches postgrest's own default so long-running queries behave as before.
+_HTTP_TIMEOUT = httpx.Timeout(120.0)
+_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=40,
+    max_connections=60,
+    keepalive_expiry=60,
+)
+
+
+def _build_http_client() -> httpx.Client:
+    """Build the pooled HTTP/2 client shared by all Supabase sub-clients."""
+    return httpx.Client(
+        transport=httpx.HTTPTransport(retries=3, http2=True, limits=_HTTP_LIMITS),
+        timeout=_HTTP_TIMEOUT,
+        follow_redirects=True,
+    )
 
 
+@lru_cache(maxsize=1)
 def get_supabase_admin() -> Client:
-    """Initialize and return Supabase admin client."""
+    """Return the process-wide Supabase admin client.
+
+    The client is created on first use and reused afterwards; call
+    ``reset_supabase_admin()`` to drop it (e.g. between tests).
+    """
     return create_client(
-        Config.SUPABASE_URL,
-        Config.SUPABASE_SERVICE_ROLE_KEY,
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_ROLE_KEY,
+        options=SyncClientOptions(httpx_client=_build_http_client()),
     )
 
+
+def reset_supabase_admin() -> None:
+    """Discard the cached Supabase admin client and close its connections."""
+    if get_supabase_admin.cache_info().currsize:
+        get_supabase_admin().postgrest.session.close()
+    get_supabase_admin.cache_clear()
+
+
+async def run_query(builder):
+    """Execute a PostgREST request builder without blocking the event loop.
+
+    The Supabase client is synchronous, so ``execute()`` runs in the default
+    thread pool; the shared httpx client is safe to use from several threads.
+    """
+    return await asyncio.to_thread(builder.execute)
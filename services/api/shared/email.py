@@ -1,7 +1,102 @@
 """Email utilities for variable replacement."""
 
+import html
 import re
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
+
+_VAR_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+def _unchanged(content: str) -> str:
+    return content
+
+
+def build_replacer(
+    data: Optional[Dict[str, str]],
+    escape_html: bool = False,
+) -> Callable[[str], str]:
+    """Return a function that replaces {{variable}} placeholders from data.
+    
+    Each variable is resolved against data once and remembered, so rendering
+    several sections for the same recipient does not repeat the lookups.
+    
+    Args:
+        data: Dictionary of values to replace
+        escape_html: HTML-escape substituted values (recipient data is
+            untrusted); the surrounding content is left as authored
+        
+    Returns:
+        Callable taking text content and returning it with replaced variables
+    """
+    if not data:
+        return _unchanged
+    
+    resolved: Dict[str, str] = {}
+    
+    def replacer(match):
+        variable = match.group(1)
+        value = resolved.get(variable)
+        if value is None:
+            # Check exact, lower, upper
+            val = (
+                data.get(variable) or 
+                data.get(variable.lower()) or 
+                data.get(variable.upper())
+            )
+            if val is None:
+                value = match.group(0)
+            elif escape_html:
+                value = html.escape(str(val))
+            else:
+                value = str(val)
+            resolved[variable] = value
+        return value
+    
+    def replace(content: str) -> str:
+        if "{{" not in content:
+            return content
+        return _VAR_RE.sub(replacer, content)
+    
+    return replace
+
+
+def compile_template(content: str) -> Callable[[Optional[Dict[str, str]]], str]:
+    """Pre-split content on its {{variable}} placeholders.
+    
+    For a template rendered once per recipient (e.g. a subject line); the
+    returned function gives the same result as replace_variables(content, data)
+    without rescanning the template each call.
+    
+    Args:
+        content: The text content containing placeholders
+        
+    Returns:
+        Callable taking the data dictionary and returning the replaced string
+    """
+    # Alternating literal fragments and variable names: [lit, var, lit, ..., lit]
+    parts = _VAR_RE.split(content)
+    if len(parts) == 1:
+        return lambda data: content
+    
+    literals = parts[0::2]
+    variables = parts[1::2]
+    
+    def render(data: Optional[Dict[str, str]]) -> str:
+        if not data:
+            return content
+        pieces = [literals[0]]
+        for variable, literal in zip(variables, literals[1:]):
+            # Check exact, lower, upper
+            val = (
+                data.get(variable) or 
+                data.get(variable.lower()) or 
+                data.get(variable.upper())
+            )
+            pieces.append("{{" + variable + "}}" if val is None else str(val))
+            pieces.append(literal)
+        return "".join(pieces)
+    
+    return render
 
 
 def replace_variables(content: str, data: Optional[Dict[str, str]]) -> str:
@@ -14,18 +109,7 @@ def replace_variables(content: str, data: Optional[Dict[str, str]]) -> str:
     Returns:
         String with replaced variables
     """
-    if not data:
+    if not data or "{{" not in content:
         return content
-        
-    def replacer(match):
-        variable = match.group(1)
-        # Check exact, lower, upper
-        val = (
-            data.get(variable) or 
-            data.get(variable.lower()) or 
-            data.get(variable.upper())
-        )
-        return str(val) if val is not None else match.group(0)
-        
-    return re.sub(r'\{\{(\w+)\}\}', replacer, content)
+    return build_replacer(data)(content)
 
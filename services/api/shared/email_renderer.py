@@ -3,10 +3,12 @@
 import hmac
 import hashlib
 import re
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
-from config import Config
+from config import settings
+from shared.email import build_replacer
 
 # Brand colors matching OutreachMarketing template
 BRAND = {
@@ -22,13 +24,21 @@ BRAND = {
 }
 
 
+@lru_cache(maxsize=100_000)
+def _unsub_token(email_lower: str) -> str:
+    """Return the unsubscribe token for a lower-cased address.
+
+    The secret is fixed for the life of the process; call
+    ``_unsub_token.cache_clear()`` if it is ever rotated at runtime.
+    """
+    secret = settings.UNSUBSCRIBE_SECRET.encode('utf-8')
+    return hmac.new(secret, email_lower.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+
 def generate_unsubscribe_url(email: str, campaign_id: Optional[str] = None) -> str:
     """Generate a signed unsubscribe URL."""
-    secret = Config.UNSUBSCRIBE_SECRET.encode('utf-8')
-    msg = email.lower().encode('utf-8')
-    
-    token = hmac.new(secret, msg, hashlib.sha256).hexdigest()[:16]
-    base_url = Config.FRONTEND_URL
+    token = _unsub_token(email.lower())
+    base_url = settings.FRONTEND_URL
     
     params_dict = {'email': email, 'token': token}
     if campaign_id:
@@ -38,44 +48,12 @@ def generate_unsubscribe_url(email: str, campaign_id: Optional[str] = None) -> s
     return f"{base_url}/api/unsubscribe?{params}"
 
 
-def generate_email_html(
-    sections: List[Dict[str, Any]],
-    subject_line: str,
-    recipient_data: Dict[str, Any],
-    generated_content: Optional[Dict[str, str]] = None,
-    campaign_id: Optional[str] = None
-) -> str:
-    """Generate the full email HTML."""
-    from shared.email import replace_variables
-    
-    processed_subject = replace_variables(subject_line, recipient_data)
-    cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
-    unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
-    
-    sections_html_parts = []
-    
-    for section in sections:
-        s_type = section.get('type', 'text')
-        s_mode = section.get('mode', 'static')
-        s_id = section.get('id', '')
-        s_name = section.get('name', '')
-        s_content = section.get('content', '')
-        s_button_url = section.get('buttonUrl', '#')
-        
-        if s_type == 'button':
-            button_text = s_content
-            if s_mode == 'personalized':
-                if generated_content and s_id in generated_content:
-                    button_text = generated_content[s_id]
-                else:
-                    button_text = f"[{s_name} - AI Generated]"
-            else:
-                button_text = replace_variables(s_content, recipient_data)
-                
-            sections_html_parts.append(f'''
+# Markup fragments with BRAND colors baked in at import time; only the
+# per-recipient values are substituted while rendering.
+_BUTTON_TEMPLATE = '''
         <div style="margin: 24px 0; text-align: center;">
-          <a href="{s_button_url}" style="
-            background-color: {BRAND['primary']};
+          <a href="{{url}}" style="
+            background-color: {brand[primary]};
             color: #ffffff;
             padding: 14px 32px;
             border-radius: 8px;
@@ -86,42 +64,28 @@ def generate_email_html(
             font-weight: 600;
             font-size: 16px;
             text-align: center;
-          ">{button_text}</a>
+          ">{{text}}</a>
         </div>
-            ''')
-        else:
-            final_text = ""
-            
-            if s_mode == 'personalized':
-                if generated_content and s_id in generated_content:
-                    final_text = generated_content[s_id]
-                else:
-                    final_text = f"[{s_name} - Missing Content]" 
-            else:
-                final_text = replace_variables(s_content, recipient_data)
-                
-            paragraphs = final_text.split('\n\n')
-            p_htmls = []
-            for p in paragraphs:
-                processed = p.replace('\n', '<br>')
-                processed = re.sub(r'<strong>(.*?)</strong>', r'<strong>\1</strong>', processed)
-                p_htmls.append(f'<p style="margin: 0 0 16px 0; font-size: 15px; color: {BRAND["textMuted"]}; line-height: 1.6;">{processed}</p>')
-                
-            sections_html_parts.append(''.join(p_htmls))
-            
-    sections_html = ''.join(sections_html_parts)
-    
-    return f'''
+            '''.format(brand=BRAND)
+
+_PARAGRAPH_OPEN = (
+    '<p style="margin: 0 0 16px 0; font-size: 15px; color: {brand[textMuted]}; line-height: 1.6;">'
+).format(brand=BRAND)
+_PARAGRAPH_CLOSE = '</p>'
+
+_EMPTY_SECTIONS_HTML = '<p style="color: #9ca3af; font-style: italic;">No content available</p>'
+
+_LAYOUT_TEMPLATE = '''
 <!DOCTYPE html>
 <html>
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{processed_subject}</title>
+  <title>{{subject}}</title>
 </head>
 <body style="
   font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif, 'Apple Color Emoji', 'Segoe UI Emoji', 'Segoe UI Symbol';
-  background-color: {BRAND['bgLight']};
+  background-color: {brand[bgLight]};
   margin: 0;
   padding: 16px 0;
   font-size: 15px;
@@ -131,14 +95,14 @@ def generate_email_html(
     width: 100%;
     max-width: 640px;
     margin: 0 auto;
-    background-color: {BRAND['bgCard']};
+    background-color: {brand[bgCard]};
     border-radius: 16px;
-    border: 1px solid {BRAND['border']};
+    border: 1px solid {brand[border]};
     overflow: hidden;
     box-shadow: 0 18px 45px rgba(15, 23, 42, 0.08), 0 8px 20px rgba(15, 23, 42, 0.06);
   ">
     <div style="
-      background-color: {BRAND['primary']};
+      background-color: {brand[primary]};
       padding: 18px 20px;
     ">
       <table cellpadding="0" cellspacing="0" border="0" width="100%">
@@ -158,7 +122,7 @@ def generate_email_html(
               font-size: 11px;
               letter-spacing: 0.14em;
               text-transform: uppercase;
-              color: {BRAND['primaryLight']};
+              color: {brand[primaryLight]};
             ">OZListings</div>
             <div style="
               margin: 2px 0 0 0;
@@ -166,34 +130,34 @@ def generate_email_html(
               line-height: 1.4;
               color: #ffffff;
               font-weight: 800;
-            ">{processed_subject or 'Email Preview'}</div>
+            ">{{heading}}</div>
           </td>
         </tr>
       </table>
     </div>
 
     <div style="padding: 20px 20px 18px 20px;">
-      {sections_html or '<p style="color: #9ca3af; font-style: italic;">No content available</p>'}
+      {{sections}}
     </div>
 
     <div style="
-      border-top: 1px solid {BRAND['border']};
+      border-top: 1px solid {brand[border]};
       padding: 12px 24px 20px 24px;
-      background-color: {BRAND['bgFooter']};
+      background-color: {brand[bgFooter]};
     ">
       <p style="
         margin: 0 0 4px 0;
         font-size: 11px;
-        color: {BRAND['textLight']};
+        color: {brand[textLight]};
       ">
         This email was sent to you because you're listed as a developer with
         an Opportunity Zone project. If you'd prefer not to receive these
-        emails, you can <a href="{unsubscribe_url}" style="color: {BRAND['primary']}; text-decoration: underline;">unsubscribe</a>.
+        emails, you can <a href="{{unsubscribe_url}}" style="color: {brand[primary]}; text-decoration: underline;">unsubscribe</a>.
       </p>
       <p style="
         margin: 0;
         font-size: 11px;
-        color: {BRAND['textLight']};
+        color: {brand[textLight]};
       ">
         © 2024 OZListings. All rights reserved.
       </p>
@@ -201,7 +165,76 @@ def generate_email_html(
   </div>
 </body>
 </html>
-'''
+'''.format(brand=BRAND)
+
+# Split around the section slot; sections are joined in between.
+_LAYOUT_HEAD, _, _LAYOUT_FOOT = _LAYOUT_TEMPLATE.partition('{sections}')
+
+
+def generate_email_html(
+    sections: List[Dict[str, Any]],
+    subject_line: str,
+    recipient_data: Dict[str, Any],
+    generated_content: Optional[Dict[str, str]] = None,
+    campaign_id: Optional[str] = None
+) -> str:
+    """Generate the full email HTML."""
+    replace = build_replacer(recipient_data, escape_html=True)
+    processed_subject = replace(subject_line)
+    cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
+    
+    parts = [_LAYOUT_HEAD.format(
+        subject=processed_subject,
+        heading=processed_subject or 'Email Preview',
+    )]
+    
+    rendered = False
+    for section in sections:
+        s_type = section.get('type', 'text')
+        s_mode = section.get('mode', 'static')
+        s_id = section.get('id', '')
+        s_name = section.get('name', '')
+        s_content = section.get('content', '')
+        s_button_url = section.get('buttonUrl', '#')
+        
+        if s_type == 'button':
+            button_text = s_content
+            if s_mode == 'personalized':
+                if generated_content and s_id in generated_content:
+                    button_text = generated_content[s_id]
+                else:
+                    button_text = f"[{s_name} - AI Generated]"
+            else:
+                button_text = replace(s_content)
+                
+            parts.append(_BUTTON_TEMPLATE.format(url=s_button_url, text=button_text))
+        else:
+            final_text = ""
+            
+            if s_mode == 'personalized':
+                if generated_content and s_id in generated_content:
+                    final_text = generated_content[s_id]
+                else:
+                    final_text = f"[{s_name} - Missing Content]" 
+            else:
+                final_text = replace(s_content)
+                
+            paragraphs = final_text.split('\n\n')
+            for p in paragraphs:
+                processed = p.replace('\n', '<br>')
+                parts.append(_PARAGRAPH_OPEN)
+                parts.append(processed)
+                parts.append(_PARAGRAPH_CLOSE)
+        rendered = True
+            
+    if not rendered:
+        parts.append(_EMPTY_SECTIONS_HTML)
+    
+    unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
+    parts.append(_LAYOUT_FOOT.format(unsubscribe_url=unsubscribe_url))
+    return ''.join(parts)
+
+
 
 
 def generate_email_text(
@@ -212,9 +245,8 @@ def generate_email_text(
     campaign_id: Optional[str] = None
 ) -> str:
     """Generate a plain text email body."""
-    from shared.email import replace_variables
-    
-    processed_subject = replace_variables(subject_line, recipient_data)
+    replace = build_replacer(recipient_data)
+    processed_subject = replace(subject_line)
     cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
     unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
 
@@ -237,7 +269,7 @@ def generate_email_text(
                     else f"[{s_name} - AI Generated]"
                 )
             else:
-                button_text = replace_variables(s_content, recipient_data)
+                button_text = replace(s_content)
 
             lines.append(f"{button_text} -> {s_button_url or 'https://'}")
             continue
@@ -249,7 +281,7 @@ def generate_email_text(
                 else f"[{s_name} - Missing Content]"
             )
         else:
-            final_text = replace_variables(s_content, recipient_data)
+            final_text = replace(s_content)
 
         paragraphs = final_text.split('\n\n')
         for p in paragraphs:
@@ -2,13 +2,54 @@
 
 import logging
 import re
+from functools import lru_cache
 from typing import Any, Dict
 import httpx
-from config import Config
+import orjson
+from config import settings
 
 logger = logging.getLogger(__name__)
 
-SPARKPOST_TRANSMISSIONS_URL = "https://api.sparkpost.com/api/v1/transmissions"
+SPARKPOST_API_URL = "https://api.sparkpost.com"
+SPARKPOST_TRANSMISSIONS_URL = f"{SPARKPOST_API_URL}/api/v1/transmissions"
+
+_SPARKPOST_LIMITS = httpx.Limits(max_keepalive_connections=64)
+
+# Characters that might break SparkPost campaign ids; keep only alphanumeric,
+# spaces, hyphens, underscores
+_CAMPAIGN_NAME_RE = re.compile(r'[^a-zA-Z0-9\s\-_]')
+
+SPARKPOST_REPLY_TO = "communications@ozlistings.com"
+# Transmission options shared by every send; serialized, never mutated
+_SPARKPOST_OPTIONS = {"click_tracking": False}
+# Failed-send log lines keep only the start of SparkPost's response body
+_MAX_LOGGED_RESPONSE_CHARS = 512
+
+
+@lru_cache(maxsize=1)
+def get_sparkpost_client() -> httpx.AsyncClient:
+    """Return the process-wide SparkPost client.
+
+    Keeps TLS connections to SparkPost alive between sends and metrics
+    lookups; closed by ``close_sparkpost_client()`` on shutdown.
+    """
+    return httpx.AsyncClient(
+        base_url=SPARKPOST_API_URL,
+        headers={
+            "Authorization": settings.SPARKPOST_API_KEY,
+            "Content-Type": "application/json",
+        },
+        timeout=10,
+        http2=True,
+        limits=_SPARKPOST_LIMITS,
+    )
+
+
+async def close_sparkpost_client() -> None:
+    """Close the cached SparkPost client, if one was created."""
+    if get_sparkpost_client.cache_info().currsize:
+        await get_sparkpost_client().aclose()
+    get_sparkpost_client.cache_clear()
 
 
 async def send_sparkpost_email(
@@ -21,7 +62,7 @@ async def send_sparkpost_email(
     metadata: Dict[str, Any] | None = None,
 ) -> bool:
     """Send an email via SparkPost transmissions API."""
-    if not Config.SPARKPOST_API_KEY:
+    if not settings.SPARKPOST_API_KEY:
         logger.error(
             "[sparkpost] SPARKPOST_API_KEY is not configured; cannot send email",
             extra={"to": to_email, "subject": subject, "from": from_email},
@@ -29,37 +70,26 @@ async def send_sparkpost_email(
         return False
 
     is_html = "<" in body and ">" in body
-    text_body = body if not is_html else None
-    html_body = body if is_html else None
 
     payload: Dict[str, Any] = {
         "recipients": [{"address": {"email": to_email}}],
         "content": {
             "from": from_email,
             "subject": subject,
-            "reply_to": "communications@ozlistings.com",
-        },
-        "options": {
-            "click_tracking": False,
+            "reply_to": SPARKPOST_REPLY_TO,
+            ("html" if is_html else "text"): body,
         },
+        "options": _SPARKPOST_OPTIONS,
     }
 
     if campaign_id:
         if campaign_name:
-            sanitized_name = re.sub(r'[^a-zA-Z0-9\s\-_]', '', campaign_name)
-            max_name_len = 25
-            if len(sanitized_name) > max_name_len:
-                sanitized_name = sanitized_name[:max_name_len]
+            sanitized_name = _CAMPAIGN_NAME_RE.sub('', campaign_name)[:25]
             sparkpost_campaign_id = f"{sanitized_name} - {campaign_id}"
         else:
             sparkpost_campaign_id = campaign_id
         payload["campaign_id"] = sparkpost_campaign_id
 
-    if html_body:
-        payload["content"]["html"] = html_body
-    if text_body:
-        payload["content"]["text"] = text_body
-
     if metadata:
         payload["metadata"] = metadata
 
@@ -74,15 +104,7 @@ async def send_sparkpost_email(
     )
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
-                SPARKPOST_TRANSMISSIONS_URL,
-                json=payload,
-                headers={
-                    "Authorization": Config.SPARKPOST_API_KEY,
-                    "Content-Type": "application/json",
-                },
-            )
+        response = await get_sparkpost_client().post(SPARKPOST_TRANSMISSIONS_URL, content=orjson.dumps(payload))
 
         if response.is_success:
             logger.info(
@@ -98,7 +120,7 @@ async def send_sparkpost_email(
                 "from": from_email,
                 "subject": subject,
                 "status_code": response.status_code,
-                "response": response.text,
+                "response": response.text[:_MAX_LOGGED_RESPONSE_CHARS],
             },
         )
         return False
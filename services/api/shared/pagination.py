@@ -0,0 +1,58 @@
+"""Keyset (cursor) pagination helpers for PostgREST queries."""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value: Any, row_id: Any) -> str:
+    """Encode the last row's sort key and id as an opaque cursor."""
+    raw = f"{sort_value}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor from ``encode_cursor``.
+
+    The sort value must be an ISO timestamp and the id a UUID; both are
+    returned re-serialized, so nothing from the client reaches the PostgREST
+    filter string verbatim.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.rsplit("|", 1)
+        sort_value = datetime.fromisoformat(sort_value).isoformat()
+        row_id = str(UUID(row_id))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+
+def apply_keyset(query, cursor: Optional[str], sort_column: str, desc: bool = True):
+    """Order ``query`` by (sort_column, id) and resume after ``cursor``."""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f'{sort_column}.{op}."{sort_value}",'
+            f'and({sort_column}.eq."{sort_value}",id.{op}."{row_id}")'
+        )
+    return query.order(sort_column, desc=desc).order("id", desc=desc)
+
+
+def split_page(
+    rows: List[Dict[str, Any]], limit: int, sort_column: str
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a ``limit + 1`` result to one page and build the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last[sort_column], last["id"])
@@ -0,0 +1,45 @@
+"""Optional direct Postgres pool for hot-path queries.
+
+When ``SUPABASE_DB_URL`` is set the API opens an asyncpg pool at startup and
+uses it for lookups that run on every request; otherwise callers fall back
+to PostgREST through ``shared.db``.
+"""
+
+from typing import Optional
+
+import asyncpg
+
+from config import settings
+
+_pool: Optional[asyncpg.Pool] = None
+
+
+async def init_pg_pool() -> Optional[asyncpg.Pool]:
+    """Create the process-wide pool if a DSN is configured."""
+    global _pool
+    if _pool is None and settings.SUPABASE_DB_URL:
+        _pool = await asyncpg.create_pool(
+            settings.SUPABASE_DB_URL,
+            min_size=2,
+            max_size=10,
+            max_inactive_connection_lifetime=1800,
+            # Supabase's transaction pooler (port 6543) hands each transaction
+            # to any server connection, so named prepared statements cached on
+            # one client connection collide ("prepared statement ... already
+            # exists"); keep the cache off so any Supabase DSN works.
+            statement_cache_size=0,
+        )
+    return _pool
+
+
+def get_pg_pool() -> Optional[asyncpg.Pool]:
+    """Return the pool, or None when direct Postgres access is disabled."""
+    return _pool
+
+
+async def close_pg_pool() -> None:
+    """Close the pool on shutdown."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
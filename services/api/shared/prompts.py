@@ -1,13 +1,15 @@
 """Prompt engineering and AI generation logic."""
 
-import json
+import logging
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
 from groq import Groq
-from config import Config
+from config import settings
+
+logger = logging.getLogger(__name__)
 
 # Initialize Groq client
-groq_client = Groq(api_key=Config.GROQ_API_KEY)
+groq_client = Groq(api_key=settings.GROQ_API_KEY)
 
 
 class GeneratedSection(BaseModel):
@@ -21,6 +23,16 @@ class GenerationResponse(BaseModel):
     sections: List[GeneratedSection]
 
 
+# Schema passed with every Groq request; generated once
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "generation_response",
+        "schema": GenerationResponse.model_json_schema(),
+    }
+}
+
+
 def build_prompt(
     all_sections: List[Dict[str, Any]],
     personalized_sections: List[Dict[str, Any]],
@@ -124,21 +136,14 @@ def generate_content(
                         "content": prompt,
                     }
                 ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "generation_response",
-                        "schema": GenerationResponse.model_json_schema(),
-                    }
-                },
+                response_format=_RESPONSE_FORMAT,
             )
 
             response_content = response.choices[0].message.content
             if not response_content:
                 raise ValueError("Empty response from AI")
 
-            response_data = json.loads(response_content)
-            parsed_response = GenerationResponse.model_validate(response_data)
+            parsed_response = GenerationResponse.model_validate_json(response_content)
 
             result_map = {}
             for section in parsed_response.sections:
@@ -156,9 +161,9 @@ def generate_content(
             )
 
             if is_rate_limit and model != models_to_try[-1]:
-                print(f"Rate limit hit with model '{model}', trying fallback model '{models_to_try[models_to_try.index(model) + 1]}'")
+                logger.warning("Rate limit hit with model '%s', trying fallback model '%s'", model, models_to_try[models_to_try.index(model) + 1])
                 continue
             else:
-                print(f"AI Generation Error with model '{model}': {e}")
+                logger.error("AI Generation Error with model '%s': %s", model, e)
                 raise e
 
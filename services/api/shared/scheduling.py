@@ -1,9 +1,10 @@
 """Scheduling utilities for email campaigns."""
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from typing import Dict, List, Tuple
-from config import Config
+from config import settings
 
 
 BASE_DOMAINS = [
@@ -40,6 +41,15 @@ BASE_DOMAINS = [
 ]
 
 
+@lru_cache(maxsize=64)
+def _zi(name: str) -> ZoneInfo:
+    """Return the (immutable, shareable) ZoneInfo for a timezone name."""
+    return ZoneInfo(name)
+
+
+_UTC = _zi("UTC")
+
+
 def generate_domain_config(sender: str) -> List[Dict[str, str]]:
     """Generate domain configuration for a sender.
     
@@ -72,9 +82,9 @@ def create_date_in_timezone(
     second: int = 0
 ) -> datetime:
     """Create a datetime in the specified timezone."""
-    tz = ZoneInfo(timezone)
+    tz = _zi(timezone)
     local_dt = datetime(year, month, day, hour, minute, second, tzinfo=tz)
-    return local_dt.astimezone(ZoneInfo("UTC"))
+    return local_dt.astimezone(_UTC)
 
 
 def next_weekday_start(
@@ -85,18 +95,18 @@ def next_weekday_start(
 ) -> datetime:
     """Get the next weekday start time."""
     # If working hours are disabled, return current time + 1 minute
-    if Config.DISABLE_WORKING_HOURS:
-        tz = ZoneInfo(timezone)
+    if settings.DISABLE_WORKING_HOURS:
+        tz = _zi(timezone)
         if zoned_time.tzinfo is None:
-            zoned_time = zoned_time.replace(tzinfo=ZoneInfo("UTC")).astimezone(tz)
+            zoned_time = zoned_time.replace(tzinfo=_UTC).astimezone(tz)
         elif zoned_time.tzinfo != tz:
             zoned_time = zoned_time.astimezone(tz)
         return zoned_time + timedelta(minutes=1)
 
     # Ensure zoned_time is in the target timezone
-    tz = ZoneInfo(timezone)
+    tz = _zi(timezone)
     if zoned_time.tzinfo is None:
-        zoned_time = zoned_time.replace(tzinfo=ZoneInfo("UTC")).astimezone(tz)
+        zoned_time = zoned_time.replace(tzinfo=_UTC).astimezone(tz)
     elif zoned_time.tzinfo != tz:
         zoned_time = zoned_time.astimezone(tz)
 
@@ -125,13 +135,13 @@ def get_start_time_in_timezone(
 ) -> datetime:
     """Get the start time for scheduling in the specified timezone."""
     # If working hours are disabled, return current time
-    if Config.DISABLE_WORKING_HOURS:
-        now_utc = datetime.now(ZoneInfo("UTC"))
-        tz = ZoneInfo(timezone)
+    if settings.DISABLE_WORKING_HOURS:
+        now_utc = datetime.now(_UTC)
+        tz = _zi(timezone)
         return now_utc.astimezone(tz)
 
-    now_utc = datetime.now(ZoneInfo("UTC"))
-    tz = ZoneInfo(timezone)
+    now_utc = datetime.now(_UTC)
+    tz = _zi(timezone)
     zoned_time = now_utc.astimezone(tz)
 
     # Ensure we're working with timezone-aware datetime
@@ -174,13 +184,13 @@ def adjust_to_working_hours(
 ) -> datetime:
     """Adjust a candidate time to be within working hours."""
     # If working hours are disabled, return candidate time as-is
-    if Config.DISABLE_WORKING_HOURS:
+    if settings.DISABLE_WORKING_HOURS:
         return candidate_time
 
-    tz = ZoneInfo(timezone)
+    tz = _zi(timezone)
     # Ensure candidate_time is timezone-aware
     if candidate_time.tzinfo is None:
-        candidate_time = candidate_time.replace(tzinfo=ZoneInfo("UTC"))
+        candidate_time = candidate_time.replace(tzinfo=_UTC)
     zoned_time = candidate_time.astimezone(tz)
 
     # Weekend => next weekday start
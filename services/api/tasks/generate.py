@@ -1,7 +1,10 @@
 """Background task for email generation."""
 
+import asyncio
 import logging
-from typing import Dict, Any
+import orjson
+from typing import Any, Callable, Dict, List
+from postgrest import ReturnMethod
 from supabase import Client
 import sys
 import os
@@ -9,139 +12,185 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from shared.email import replace_variables
+from shared.cache import invalidate_campaign_caches
+from shared.db import run_query
+from shared.email import compile_template
+from shared.pg import get_pg_pool
 
 logger = logging.getLogger(__name__)
 
+# Recipient pages fetched and staged at once
+QUERY_CONCURRENCY = 8
+
+# Contact detail keys superseded by the capitalized fields on each row
+_LOWER_DUP_KEYS = frozenset({"name", "email", "company", "role", "location"})
+
+# email_queue columns written by build_queue_rows, in COPY order
+_QUEUE_COLUMNS = (
+    "campaign_id", "to_email", "subject", "body", "status", "metadata",
+    "is_edited", "from_email", "domain_index", "scheduled_for", "delay_seconds",
+)
+
+
+def build_queue_rows(campaign_id: str, render_subject: Callable[[Dict[str, Any]], str], recipients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build staged email_queue rows for a page of campaign recipients."""
+    queue_rows = []
+    
+    for recipient in recipients:
+        # Handle contact data
+        contact_data = recipient.get("contacts")
+        if isinstance(contact_data, list) and len(contact_data) > 0:
+            contact_data = contact_data[0]
+
+        if not contact_data:
+            continue
+
+        # Get email
+        target_email = recipient.get("selected_email")
+        if not target_email:
+            emails = (contact_data.get("email") or "").split(",")
+            emails = [e.strip() for e in emails if e.strip()]
+            if emails:
+                target_email = emails[0]
+
+        if not target_email:
+            continue
+
+        # Build metadata row, dropping lowercase duplicates of the fixed keys
+        details = contact_data.get("details")
+        row: Dict[str, str] = {k: v for k, v in details.items() if k not in _LOWER_DUP_KEYS} if details else {}
+        full_name = contact_data.get("name") or ""
+        row["Name"] = full_name
+        row["Email"] = target_email
+        row["Company"] = contact_data.get("company") or ""
+        row["Role"] = contact_data.get("role") or ""
+        row["Location"] = contact_data.get("location") or ""
+
+        # Programmatically split name for personalization
+        first_name, _, last_name = full_name.strip().partition(" ")
+        row["FirstName"] = first_name
+        row["LastName"] = last_name
+
+        # Generate subject with variable replacement
+        subject = render_subject(row)
+
+        queue_rows.append({
+            "campaign_id": campaign_id,
+            "to_email": target_email,
+            "subject": subject,
+            "body": "",  # Empty body triggers JIT generation
+            "status": "staged",
+            "metadata": row,
+            "is_edited": False,
+            "from_email": None,
+            "domain_index": None,
+            "scheduled_for": None,
+            "delay_seconds": 0,
+        })
+    
+    return queue_rows
+
+
+async def copy_queue_rows(pool, queue_rows: List[Dict[str, Any]]) -> None:
+    """Insert email_queue rows over the asyncpg pool with COPY."""
+    records = [
+        (
+            row["campaign_id"], row["to_email"], row["subject"], row["body"],
+            row["status"], orjson.dumps(row["metadata"]).decode(),
+            row["is_edited"], row["from_email"], row["domain_index"],
+            row["scheduled_for"], row["delay_seconds"],
+        )
+        for row in queue_rows
+    ]
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table("email_queue", records=records, columns=_QUEUE_COLUMNS)
+
 
 async def process_generate_task(campaign_id: str, supabase: Client):
     """Background task - fetch recipients and stage emails."""
     try:
-        logger.info(f"Starting email generation for campaign {campaign_id}")
+        logger.info("Starting email generation for campaign %s", campaign_id)
         
         # 1. Get campaign configuration
-        campaign_response = supabase.table("campaigns").select("*").eq("id", campaign_id).single().execute()
+        campaign_response = await run_query(supabase.table("campaigns").select("*").eq("id", campaign_id).single())
         if not campaign_response.data:
-            logger.error(f"Campaign {campaign_id} not found")
+            logger.error("Campaign %s not found", campaign_id)
             return
         
         campaign = campaign_response.data
         
         # 2. Fetch recipients from campaign_recipients table
-        # Paginate to fetch all recipients (Supabase has default limit of 1000)
+        # Paginate to fetch all recipients (Supabase has default limit of 1000);
+        # the count tells us every page up front. Each page is staged as soon
+        # as it arrives, so at most QUERY_CONCURRENCY pages are held in memory
         BATCH_SIZE = 1000
-        all_recipients = []
-        offset = 0
-        
-        while True:
-            recipients_response = supabase.table("campaign_recipients").select("*, contacts(*)").eq("campaign_id", campaign_id).range(offset, offset + BATCH_SIZE - 1).execute()
-            batch = recipients_response.data or []
-            
-            if not batch:
-                break
-                
-            all_recipients.extend(batch)
-            
-            # If we got fewer than BATCH_SIZE, we've reached the end
-            if len(batch) < BATCH_SIZE:
-                break
-                
-            offset += BATCH_SIZE
+        semaphore = asyncio.Semaphore(QUERY_CONCURRENCY)
+        count_response = await run_query(supabase.table("campaign_recipients").select("id", count="exact", head=True).eq("campaign_id", campaign_id))
+        total_recipients = count_response.count or 0
         
-        recipients = all_recipients
-        
-        if not recipients:
-            logger.warning(f"No recipients found for campaign {campaign_id}")
+        if not total_recipients:
+            logger.warning("No recipients found for campaign %s", campaign_id)
             return
         
         # 3. Delete existing staged emails
-        supabase.table("email_queue").delete().eq("campaign_id", campaign_id).eq("status", "staged").execute()
+        await run_query(supabase.table("email_queue").delete().eq("campaign_id", campaign_id).eq("status", "staged"))
         
-        # 4. Build email queue rows
-        subject_line_content = campaign.get("subject_line", {}).get("content", "")
-        queue_rows = []
+        # Subject template is parsed once for every recipient
+        render_subject = compile_template(campaign.get("subject_line", {}).get("content", ""))
+        CHUNK_SIZE = 100
         
-        for recipient in recipients:
-            # Handle contact data
-            contact_data = recipient.get("contacts")
-            if isinstance(contact_data, list) and len(contact_data) > 0:
-                contact_data = contact_data[0]
-            
-            if not contact_data:
-                continue
-            
-            # Get email
-            target_email = recipient.get("selected_email")
-            if not target_email:
-                emails = (contact_data.get("email") or "").split(",")
-                emails = [e.strip() for e in emails if e.strip()]
-                if emails:
-                    target_email = emails[0]
-            
-            if not target_email:
-                continue
-            
-            # Build metadata row
-            row: Dict[str, str] = {
-                **(contact_data.get("details") or {}),
-                "Name": contact_data.get("name") or "",
-                "Email": target_email,
-                "Company": contact_data.get("company") or "",
-                "Role": contact_data.get("role") or "",
-                "Location": contact_data.get("location") or "",
-            }
-
-            # Programmatically split name for personalization
-            full_name = contact_data.get("name") or ""
-            name_parts = full_name.strip().split(" ", 1) if full_name.strip() else ["", ""]
-            row["FirstName"] = name_parts[0] if name_parts[0] else ""
-            row["LastName"] = name_parts[1] if len(name_parts) > 1 else ""
-
-            # Remove lowercase duplicates
-            for key in ["name", "email", "company", "role", "location"]:
-                row.pop(key, None)
-            
-            # Generate subject with variable replacement
-            subject = replace_variables(subject_line_content, row)
-            
-            queue_rows.append({
-                "campaign_id": campaign_id,
-                "to_email": target_email,
-                "subject": subject,
-                "body": "",  # Empty body triggers JIT generation
-                "status": "staged",
-                "metadata": row,
-                "is_edited": False,
-                "from_email": None,
-                "domain_index": None,
-                "scheduled_for": None,
-                "delay_seconds": 0,
-            })
+        async def stage_page(offset: int) -> int:
+            async with semaphore:
+                recipients_response = await run_query(supabase.table("campaign_recipients").select("*, contacts(*)").eq("campaign_id", campaign_id).order("id").range(offset, offset + BATCH_SIZE - 1))
+                
+                # 4. Build email queue rows
+                queue_rows = build_queue_rows(campaign_id, render_subject, recipients_response.data or [])
+                
+                # 5. Bulk insert: one binary COPY per page when direct
+                # Postgres access is configured, else PostgREST chunks
+                pool = get_pg_pool()
+                if pool is not None:
+                    if queue_rows:
+                        await copy_queue_rows(pool, queue_rows)
+                        logger.info("Copied page %d (%d emails)", offset // BATCH_SIZE + 1, len(queue_rows))
+                    return len(queue_rows)
+                
+                for i in range(0, len(queue_rows), CHUNK_SIZE):
+                    chunk = queue_rows[i:i + CHUNK_SIZE]
+                    await run_query(supabase.table("email_queue").insert(chunk, returning=ReturnMethod.minimal))
+                    logger.info("Inserted chunk %d (%d emails)", (offset + i) // CHUNK_SIZE + 1, len(chunk))
+            return len(queue_rows)
         
-        # 5. Bulk insert in chunks
-        CHUNK_SIZE = 100
-        for i in range(0, len(queue_rows), CHUNK_SIZE):
-            chunk = queue_rows[i:i + CHUNK_SIZE]
-            supabase.table("email_queue").insert(chunk).execute()
-            logger.info(f"Inserted chunk {i // CHUNK_SIZE + 1} ({len(chunk)} emails)")
+        # Let every page finish before reporting a failure, so none is still
+        # inserting when the error path clears the staged rows
+        staged_counts = await asyncio.gather(*(
+            stage_page(offset) for offset in range(0, total_recipients, BATCH_SIZE)
+        ), return_exceptions=True)
+        for result in staged_counts:
+            if isinstance(result, BaseException):
+                raise result
+        staged_total = sum(staged_counts)
         
         # 6. Update campaign status
-        supabase.table("campaigns").update({
+        await run_query(supabase.table("campaigns").update({
             "status": "staged",
-            "total_recipients": len(queue_rows),
+            "total_recipients": staged_total,
             "updated_at": "now()",
-        }).eq("id", campaign_id).execute()
+        }).eq("id", campaign_id))
         
-        logger.info(f"Email generation completed for campaign {campaign_id}: {len(queue_rows)} emails staged")
+        logger.info("Email generation completed for campaign %s: %d emails staged", campaign_id, staged_total)
         
     except Exception as e:
-        logger.error(f"Error in generate task for campaign {campaign_id}: {e}", exc_info=True)
-        # Optionally update campaign status to indicate error
+        logger.error("Error in generate task for campaign %s: %s", campaign_id, e, exc_info=True)
+        # Back to draft without the pages that did get staged
         try:
-            supabase.table("campaigns").update({
+            await run_query(supabase.table("email_queue").delete().eq("campaign_id", campaign_id).eq("status", "staged"))
+            await run_query(supabase.table("campaigns").update({
                 "status": "draft",
                 "updated_at": "now()",
-            }).eq("id", campaign_id).execute()
+            }).eq("id", campaign_id))
         except Exception:
             pass
+    finally:
+        invalidate_campaign_caches()
 
@@ -1,5 +1,7 @@
 """Background task for campaign launch."""
 
+import asyncio
+import itertools
 import logging
 import random
 import sys
@@ -17,10 +19,16 @@ from shared.scheduling import (
     adjust_to_working_hours,
     create_date_in_timezone,
 )
-from config import Config
+from config import settings
+from shared.cache import invalidate_campaign_caches
+from shared.db import run_query
+from shared.pagination import apply_keyset, split_page
 
 logger = logging.getLogger(__name__)
 
+# Pages of queue updates in flight at once
+QUEUE_CONCURRENCY = 8
+
 
 async def process_launch_task(
     campaign_id: str,
@@ -49,143 +57,119 @@ async def process_launch_task(
         
         BATCH_SIZE = 1000
         staged_emails = []
-        offset = 0
+        cursor = None
         
         while True:
-            query = supabase.table("email_queue").select("*").eq("campaign_id", campaign_id).eq("status", "staged")
+            # Only what scheduling and the keyset cursor read, not bodies/metadata
+            query = supabase.table("email_queue").select("id,domain_index,created_at").eq("campaign_id", campaign_id).eq("status", "staged")
             if not all_emails and email_ids:
                 query = query.in_("id", email_ids)
             
-            query = query.order("created_at", desc=False).range(offset, offset + BATCH_SIZE - 1)
+            # Keyset on (created_at, id) so later pages don't rescan earlier ones
+            query = apply_keyset(query, cursor, "created_at", desc=False).limit(BATCH_SIZE + 1)
             staged_response = query.execute()
-            batch = staged_response.data or []
-            
-            if not batch:
-                break
-                
+            batch, cursor = split_page(staged_response.data or [], BATCH_SIZE, "created_at")
             staged_emails.extend(batch)
             
-            # If we got fewer than BATCH_SIZE, we've reached the end
-            if len(batch) < BATCH_SIZE:
+            # No cursor: that was the last page
+            if cursor is None:
                 break
-                
-            offset += BATCH_SIZE
         
         if not staged_emails:
             logger.warning(f"No staged emails found for campaign {campaign_id}")
             return
         
-        # 4. Get existing scheduled emails for domain coordination
-        # Paginate to fetch all existing scheduled emails (Supabase has default limit of 1000)
-        # We need the most recent scheduled email per domain, so we fetch all and build the map
-        existing_schedules = []
-        offset = 0
-        
-        while True:
-            existing_response = supabase.table("email_queue").select("domain_index, scheduled_for").in_("status", ["queued", "processing"]).not_.is_("scheduled_for", "null").order("scheduled_for", desc=True).range(offset, offset + BATCH_SIZE - 1).execute()
-            batch = existing_response.data or []
-            
-            if not batch:
-                break
-                
-            existing_schedules.extend(batch)
-            
-            # If we got fewer than BATCH_SIZE, we've reached the end
-            if len(batch) < BATCH_SIZE:
-                break
-                
-            offset += BATCH_SIZE
-        
-        # Build map of last scheduled time per domain
+        # 4. Get the latest scheduled email per domain for domain coordination
+        # (aggregated in Postgres: one row per domain across all campaigns)
         domain_last_scheduled: Dict[int, datetime] = {}
-        for row in existing_schedules:
-            domain_index = row.get("domain_index")
-            if domain_index is not None:
-                scheduled_for_str = row.get("scheduled_for")
-                if scheduled_for_str:
-                    scheduled_for = datetime.fromisoformat(scheduled_for_str.replace("Z", "+00:00"))
-                    if domain_index not in domain_last_scheduled:
-                        domain_last_scheduled[domain_index] = scheduled_for
+        last_scheduled_response = supabase.rpc("get_domain_last_scheduled").execute()
+        for row in last_scheduled_response.data or []:
+            domain_last_scheduled[row["domain_index"]] = datetime.fromisoformat(row["scheduled_for"])
         
         # 5. Calculate scheduling
         SCHEDULING_CONFIG = {
-            "timezone": Config.TIMEZONE,
-            "working_hour_start": Config.WORKING_HOUR_START,
-            "working_hour_end": Config.WORKING_HOUR_END,
+            "timezone": settings.TIMEZONE,
+            "working_hour_start": settings.WORKING_HOUR_START,
+            "working_hour_end": settings.WORKING_HOUR_END,
             "skip_weekends": True,
         }
         
         start_time_utc = get_start_time_in_timezone(
-            Config.TIMEZONE,
-            Config.WORKING_HOUR_START,
-            Config.WORKING_HOUR_END,
+            settings.TIMEZONE,
+            settings.WORKING_HOUR_START,
+            settings.WORKING_HOUR_END,
             True
         )
-        interval_ms = Config.INTERVAL_MINUTES * 60 * 1000
-        
-        domain_current_time: Dict[int, datetime] = {}
-        round_robin_index = 0
+        interval_ms = settings.INTERVAL_MINUTES * 60 * 1000
+        
+        # Loop invariants, read once rather than per email
+        timezone_name = settings.TIMEZONE
+        working_hour_start = settings.WORKING_HOUR_START
+        working_hour_end = settings.WORKING_HOUR_END
+        jitter_max_ms = settings.JITTER_SECONDS_MAX * 1000
+        domain_count = len(DOMAIN_CONFIG)
+        from_emails = [
+            f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>"
+            for domain_config in DOMAIN_CONFIG
+        ]
+        
+        # Round-robin slot for every email, consumed in order even when the
+        # email keeps its existing domain
+        round_robin = itertools.cycle(range(domain_count))
         
         # 6. Process emails in batches
         PAGE_SIZE = 1000
         total_queued = 0
+        semaphore = asyncio.Semaphore(QUEUE_CONCURRENCY)
         
+        async def queue_page(page_updates: List[Dict[str, Any]]):
+            # Queue the whole page in one statement
+            async with semaphore:
+                await run_query(supabase.rpc("queue_scheduled_emails", {"p_emails": page_updates}))
+        
+        page_tasks = []
         for i in range(0, len(staged_emails), PAGE_SIZE):
             page_emails = staged_emails[i:i + PAGE_SIZE]
+            page_updates = []
             
             for email in page_emails:
                 existing_domain_index = email.get("domain_index")
-                domain_index = existing_domain_index if existing_domain_index is not None else (round_robin_index % len(DOMAIN_CONFIG))
-                round_robin_index += 1
+                round_robin_index = next(round_robin)
+                domain_index = existing_domain_index if existing_domain_index is not None else round_robin_index
                 
-                domain_config = DOMAIN_CONFIG[domain_index]
-                jitter_ms = random.random() * Config.JITTER_SECONDS_MAX * 1000
+                jitter_ms = random.random() * jitter_max_ms
                 
-                # Calculate scheduled_for
-                if domain_index in domain_last_scheduled and domain_index not in domain_current_time:
-                    # Has existing scheduled emails from other campaigns
-                    last_scheduled = domain_last_scheduled[domain_index]
-                    scheduled_for = adjust_to_working_hours(
-                        last_scheduled + timedelta(milliseconds=interval_ms + jitter_ms),
-                        Config.TIMEZONE,
-                        Config.WORKING_HOUR_END,
-                        Config.WORKING_HOUR_START,
-                        True
-                    )
-                elif domain_index in domain_current_time:
-                    # Has emails in current batch
-                    scheduled_for = adjust_to_working_hours(
-                        domain_current_time[domain_index] + timedelta(milliseconds=interval_ms + jitter_ms),
-                        Config.TIMEZONE,
-                        Config.WORKING_HOUR_END,
-                        Config.WORKING_HOUR_START,
-                        True
-                    )
+                # Follow the domain's last send (from this run or other campaigns);
+                # the first email for a domain starts from start_time_utc
+                previous = domain_last_scheduled.get(domain_index)
+                if previous is None:
+                    candidate_time = start_time_utc + timedelta(milliseconds=jitter_ms)
                 else:
-                    # First email for this domain
-                    scheduled_for = adjust_to_working_hours(
-                        start_time_utc + timedelta(milliseconds=jitter_ms),
-                        Config.TIMEZONE,
-                        Config.WORKING_HOUR_END,
-                        Config.WORKING_HOUR_START,
-                        True
-                    )
-                
-                domain_current_time[domain_index] = scheduled_for
+                    candidate_time = previous + timedelta(milliseconds=interval_ms + jitter_ms)
+                scheduled_for = adjust_to_working_hours(
+                    candidate_time,
+                    timezone_name,
+                    working_hour_end,
+                    working_hour_start,
+                    True
+                )
                 domain_last_scheduled[domain_index] = scheduled_for
                 
-                # Update email
-                supabase.table("email_queue").update({
-                    "status": "queued",
+                page_updates.append({
+                    "id": email["id"],
                     "domain_index": domain_index,
-                    "from_email": f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>",
+                    "from_email": from_emails[domain_index],
                     "scheduled_for": scheduled_for.isoformat(),
-                }).eq("id", email["id"]).execute()
-                
-                total_queued += 1
+                })
+            
+            # Write the page while the next one is scheduled
+            page_tasks.append(asyncio.create_task(queue_page(page_updates)))
+            total_queued += len(page_updates)
             
             logger.info(f"Processed page {i // PAGE_SIZE + 1}: {len(page_emails)} emails")
         
+        await asyncio.gather(*page_tasks)
+        
         # 7. Update campaign status
         supabase.table("campaigns").update({
             "status": "scheduled",
@@ -196,4 +180,6 @@ async def process_launch_task(
         
     except Exception as e:
         logger.error(f"Error in launch task for campaign {campaign_id}: {e}", exc_info=True)
+    finally:
+        invalidate_campaign_caches()
 
@@ -1,11 +1,13 @@
 """Background task for retrying failed emails."""
 
+import asyncio
+import itertools
 import logging
 import random
 import sys
 import os
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Any, Dict, List
 from supabase import Client
 
 # Add parent directory to path for imports
@@ -16,10 +18,16 @@ from shared.scheduling import (
     get_start_time_in_timezone,
     adjust_to_working_hours,
 )
-from config import Config
+from config import settings
+from shared.cache import invalidate_campaign_caches
+from shared.db import run_query
+from shared.pagination import apply_keyset, split_page
 
 logger = logging.getLogger(__name__)
 
+# Pages of queue updates in flight at once
+QUEUE_CONCURRENCY = 8
+
 
 async def process_retry_failed_task(campaign_id: str, supabase: Client):
     """Background task - retry failed emails."""
@@ -38,22 +46,20 @@ async def process_retry_failed_task(campaign_id: str, supabase: Client):
         # Paginate to fetch all failed emails (Supabase has default limit of 1000)
         BATCH_SIZE = 1000
         failed_emails = []
-        offset = 0
+        cursor = None
         
         while True:
-            failed_response = supabase.table("email_queue").select("*").eq("campaign_id", campaign_id).eq("status", "failed").order("created_at", desc=False).range(offset, offset + BATCH_SIZE - 1).execute()
-            batch = failed_response.data or []
-            
-            if not batch:
-                break
-                
+            # Keyset on (created_at, id) so later pages don't rescan earlier ones
+            # Only what scheduling and the keyset cursor read, not bodies/metadata
+            query = supabase.table("email_queue").select("id,domain_index,created_at").eq("campaign_id", campaign_id).eq("status", "failed")
+            query = apply_keyset(query, cursor, "created_at", desc=False).limit(BATCH_SIZE + 1)
+            failed_response = query.execute()
+            batch, cursor = split_page(failed_response.data or [], BATCH_SIZE, "created_at")
             failed_emails.extend(batch)
             
-            # If we got fewer than BATCH_SIZE, we've reached the end
-            if len(batch) < BATCH_SIZE:
+            # No cursor: that was the last page
+            if cursor is None:
                 break
-                
-            offset += BATCH_SIZE
         
         if not failed_emails:
             logger.info(f"No failed emails found for campaign {campaign_id}")
@@ -62,102 +68,85 @@ async def process_retry_failed_task(campaign_id: str, supabase: Client):
         # 3. Generate domain config
         DOMAIN_CONFIG = generate_domain_config(campaign.get("sender", "jeff_richmond"))
         
-        # 4. Get existing scheduled emails for domain coordination
-        # Paginate to fetch all existing scheduled emails (Supabase has default limit of 1000)
-        # We need the most recent scheduled email per domain, so we fetch all and build the map
-        existing_schedules = []
-        offset = 0
-        
-        while True:
-            existing_response = supabase.table("email_queue").select("domain_index, scheduled_for").in_("status", ["queued", "processing"]).not_.is_("scheduled_for", "null").order("scheduled_for", desc=True).range(offset, offset + BATCH_SIZE - 1).execute()
-            batch = existing_response.data or []
-            
-            if not batch:
-                break
-                
-            existing_schedules.extend(batch)
-            
-            # If we got fewer than BATCH_SIZE, we've reached the end
-            if len(batch) < BATCH_SIZE:
-                break
-                
-            offset += BATCH_SIZE
-        
+        # 4. Get the latest scheduled email per domain for domain coordination
+        # (aggregated in Postgres: one row per domain across all campaigns)
         domain_last_scheduled: Dict[int, datetime] = {}
-        for row in existing_schedules:
-            domain_index = row.get("domain_index")
-            if domain_index is not None:
-                scheduled_for_str = row.get("scheduled_for")
-                if scheduled_for_str:
-                    scheduled_for = datetime.fromisoformat(scheduled_for_str.replace("Z", "+00:00"))
-                    if domain_index not in domain_last_scheduled:
-                        domain_last_scheduled[domain_index] = scheduled_for
+        last_scheduled_response = supabase.rpc("get_domain_last_scheduled").execute()
+        for row in last_scheduled_response.data or []:
+            domain_last_scheduled[row["domain_index"]] = datetime.fromisoformat(row["scheduled_for"])
         
         # 5. Calculate scheduling
         start_time_utc = get_start_time_in_timezone(
-            Config.TIMEZONE,
-            Config.WORKING_HOUR_START,
-            Config.WORKING_HOUR_END,
+            settings.TIMEZONE,
+            settings.WORKING_HOUR_START,
+            settings.WORKING_HOUR_END,
             True
         )
-        interval_ms = Config.INTERVAL_MINUTES * 60 * 1000
+        interval_ms = settings.INTERVAL_MINUTES * 60 * 1000
         
-        domain_current_time: Dict[int, datetime] = {}
-        round_robin_index = 0
-        total_retried = 0
+        # Loop invariants, read once rather than per email
+        timezone_name = settings.TIMEZONE
+        working_hour_start = settings.WORKING_HOUR_START
+        working_hour_end = settings.WORKING_HOUR_END
+        jitter_max_ms = settings.JITTER_SECONDS_MAX * 1000
+        domain_count = len(DOMAIN_CONFIG)
+        from_emails = [
+            f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>"
+            for domain_config in DOMAIN_CONFIG
+        ]
+        
+        # Round-robin slot for every email, consumed in order even when the
+        # email keeps its existing domain
+        round_robin = itertools.cycle(range(domain_count))
         
         # 6. Reschedule failed emails
+        updates = []
         for email in failed_emails:
             existing_domain_index = email.get("domain_index")
-            domain_index = existing_domain_index if existing_domain_index is not None else (round_robin_index % len(DOMAIN_CONFIG))
-            round_robin_index += 1
+            round_robin_index = next(round_robin)
+            domain_index = existing_domain_index if existing_domain_index is not None else round_robin_index
             
-            domain_config = DOMAIN_CONFIG[domain_index]
-            jitter_ms = random.random() * Config.JITTER_SECONDS_MAX * 1000
+            jitter_ms = random.random() * jitter_max_ms
             
-            # Calculate scheduled_for
-            if domain_index in domain_last_scheduled and domain_index not in domain_current_time:
-                last_scheduled = domain_last_scheduled[domain_index]
-                scheduled_for = adjust_to_working_hours(
-                    last_scheduled + timedelta(milliseconds=interval_ms + jitter_ms),
-                    Config.TIMEZONE,
-                    Config.WORKING_HOUR_END,
-                    Config.WORKING_HOUR_START,
-                    True
-                )
-            elif domain_index in domain_current_time:
-                scheduled_for = adjust_to_working_hours(
-                    domain_current_time[domain_index] + timedelta(milliseconds=interval_ms + jitter_ms),
-                    Config.TIMEZONE,
-                    Config.WORKING_HOUR_END,
-                    Config.WORKING_HOUR_START,
-                    True
-                )
+            # Follow the domain's last send (from this run or other campaigns);
+            # the first email for a domain starts from start_time_utc
+            previous = domain_last_scheduled.get(domain_index)
+            if previous is None:
+                candidate_time = start_time_utc + timedelta(milliseconds=jitter_ms)
             else:
-                scheduled_for = adjust_to_working_hours(
-                    start_time_utc + timedelta(milliseconds=jitter_ms),
-                    Config.TIMEZONE,
-                    Config.WORKING_HOUR_END,
-                    Config.WORKING_HOUR_START,
-                    True
-                )
-            
-            domain_current_time[domain_index] = scheduled_for
+                candidate_time = previous + timedelta(milliseconds=interval_ms + jitter_ms)
+            scheduled_for = adjust_to_working_hours(
+                candidate_time,
+                timezone_name,
+                working_hour_end,
+                working_hour_start,
+                True
+            )
             domain_last_scheduled[domain_index] = scheduled_for
             
-            # Update email
-            supabase.table("email_queue").update({
-                "status": "queued",
+            updates.append({
+                "id": email["id"],
                 "domain_index": domain_index,
-                "from_email": f"{domain_config['display_name']} <{domain_config['sender_local']}@{domain_config['domain']}>",
+                "from_email": from_emails[domain_index],
                 "scheduled_for": scheduled_for.isoformat(),
-                "error_message": None,
-            }).eq("id", email["id"]).execute()
-            
-            total_retried += 1
+            })
+        
+        # Queue in pages, one statement each, clearing the previous error
+        semaphore = asyncio.Semaphore(QUEUE_CONCURRENCY)
+        
+        async def queue_page(page_updates: List[Dict[str, Any]]):
+            async with semaphore:
+                await run_query(supabase.rpc("queue_scheduled_emails", {"p_emails": page_updates, "p_clear_error": True}))
+        
+        await asyncio.gather(*(
+            queue_page(updates[i:i + BATCH_SIZE]) for i in range(0, len(updates), BATCH_SIZE)
+        ))
+        total_retried = len(updates)
         
         logger.info(f"Retry completed for campaign {campaign_id}: {total_retried} emails rescheduled")
         
     except Exception as e:
         logger.error(f"Error in retry task for campaign {campaign_id}: {e}", exc_info=True)
+    finally:
+        invalidate_campaign_caches()
 
@@ -1,7 +1,8 @@
 """Configuration for campaign runner worker."""
 
 import os
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
 
 from dotenv import load_dotenv
 
@@ -10,49 +11,76 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
     """Application configuration loaded from environment variables."""
 
     # Supabase
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
-    SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    SUPABASE_URL: str
+    SUPABASE_SERVICE_ROLE_KEY: str
 
     # SparkPost
-    SPARKPOST_API_KEY: str = os.getenv("SPARKPOST_API_KEY", "")
-    # GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")  # Commented out - switched to Groq
-    GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    SPARKPOST_API_KEY: str
+    # GEMINI_API_KEY: str  # Commented out - switched to Groq
+    GROQ_API_KEY: str
 
     # Secrets
-    UNSUBSCRIBE_SECRET: str = os.getenv("UNSUBSCRIBE_SECRET", "")
+    UNSUBSCRIBE_SECRET: str
 
 
     # Logging
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVEL: str
 
     # Timezone for working hours (9am-5pm)
     # Default: Asia/Kolkata (Mumbai)
     # Production: America/Los_Angeles (Pacific Time)
-    TIMEZONE: str = os.getenv("TIMEZONE", "Asia/Kolkata")
+    TIMEZONE: str
 
     # Disable working hours scheduling restrictions (9am-5pm)
     # When set to 'true', campaigns can run 24/7
-    DISABLE_WORKING_HOURS: bool = os.getenv("DISABLE_WORKING_HOURS", "false").lower() == "true"
+    DISABLE_WORKING_HOURS: bool
 
     @classmethod
-    def validate(cls) -> None:
+    def from_env(cls) -> "Config":
+        """Build a configuration snapshot from the current environment.
+
+        String-to-bool and other conversions happen here, once, so the
+        polling loop only does slot reads.
+        """
+        return cls(
+            SUPABASE_URL=os.getenv("SUPABASE_URL", ""),
+            SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY", ""),
+            SPARKPOST_API_KEY=os.getenv("SPARKPOST_API_KEY", ""),
+            # GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", ""),  # Commented out - switched to Groq
+            GROQ_API_KEY=os.getenv("GROQ_API_KEY", ""),
+            UNSUBSCRIBE_SECRET=os.getenv("UNSUBSCRIBE_SECRET", ""),
+            LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO"),
+            TIMEZONE=os.getenv("TIMEZONE", "Asia/Kolkata"),
+            DISABLE_WORKING_HOURS=os.getenv("DISABLE_WORKING_HOURS", "false").lower() == "true",
+        )
+
+    def validate(self) -> None:
         """Validate that all required configuration variables are set."""
-        if not cls.SUPABASE_URL:
+        if not self.SUPABASE_URL:
             raise ValueError("SUPABASE_URL environment variable is required")
-        if not cls.SUPABASE_SERVICE_ROLE_KEY:
+        if not self.SUPABASE_SERVICE_ROLE_KEY:
             raise ValueError(
                 "SUPABASE_SERVICE_ROLE_KEY environment variable is required"
             )
-        if not cls.SPARKPOST_API_KEY:
+        if not self.SPARKPOST_API_KEY:
             raise ValueError("SPARKPOST_API_KEY environment variable is required")
-        # if not cls.GEMINI_API_KEY:
+        # if not self.GEMINI_API_KEY:
         #     raise ValueError("GEMINI_API_KEY environment variable is required")  # Commented out - switched to Groq
-        if not cls.GROQ_API_KEY:
+        if not self.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY environment variable is required")
-        if not cls.UNSUBSCRIBE_SECRET:
+        if not self.UNSUBSCRIBE_SECRET:
             raise ValueError("UNSUBSCRIBE_SECRET environment variable is required")
 
+
+@lru_cache(maxsize=1)
+def get_settings() -> Config:
+    """Return the process-wide configuration snapshot."""
+    return Config.from_env()
+
+
+settings = get_settings()
@@ -1,19 +1,45 @@
 """Database operations for campaign runner."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
+import httpx
+from postgrest import ReturnMethod
 from supabase import Client, create_client
+from supabase.lib.client_options import SyncClientOptions
 
-from config import Config
+from config import settings
 
+# Matches postgrest's own default so long-running queries behave as before.
+_HTTP_TIMEOUT = httpx.Timeout(120.0)
+# The worker issues one query at a time, so a handful of kept-alive
+# connections covers it
+_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=8,
+    max_connections=16,
+    keepalive_expiry=60,
+)
 
+
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
-    """Initialize and return Supabase client."""
+    """Return the worker's Supabase client.
+
+    Created on first use and reused across polls, so its pooled HTTP/2
+    connection is not re-established (TCP + TLS) for every batch.
+    """
     return create_client(
-        Config.SUPABASE_URL,
-        Config.SUPABASE_SERVICE_ROLE_KEY,
+        settings.SUPABASE_URL,
+        settings.SUPABASE_SERVICE_ROLE_KEY,
+        options=SyncClientOptions(
+            httpx_client=httpx.Client(
+                transport=httpx.HTTPTransport(retries=3, http2=True, limits=_HTTP_LIMITS),
+                timeout=_HTTP_TIMEOUT,
+                follow_redirects=True,
+            )
+        ),
     )
 
 
@@ -138,54 +164,106 @@ def pause_campaign(supabase: Client, campaign_id: str, reason: str) -> bool:
         return False
 
 
-def mark_processing(supabase: Client, email_id: int) -> bool:
-    """Mark an email as processing.
+def mark_processing_batch(supabase: Client, email_ids: List[str]) -> Set[str]:
+    """Mark several emails as processing in one statement.
     
-    This acts as a lock to prevent other workers from processing the same email.
+    This acts as a lock to prevent other workers from processing the same
+    emails: only rows still queued are claimed (claim_queued_emails RPC).
     
     Args:
         supabase: Supabase client instance
-        email_id: ID of the email queue row
+        email_ids: IDs of the email queue rows
         
     Returns:
-        True if update succeeded, False otherwise
+        IDs of the emails that were still queued and are now locked
     """
+    if not email_ids:
+        return set()
     try:
-        response = (
-            supabase.table("email_queue")
-            .update({"status": "processing"})
-            .eq("id", email_id)
-            .eq("status", "queued")  # Only update if still queued (optimistic locking)
-            .execute()
-        )
-        return len(response.data) > 0
+        response = supabase.rpc("claim_queued_emails", {"p_ids": email_ids}).execute()
+        return set(response.data or [])
     except Exception:
-        return False
+        return set()
 
 
-def mark_sent(supabase: Client, email_id: int) -> bool:
-    """Mark an email as sent.
+def mark_sent_batch(supabase: Client, email_ids: List[str]) -> bool:
+    """Mark several emails as sent in one statement.
     
     Args:
         supabase: Supabase client instance
-        email_id: ID of the email queue row
+        email_ids: IDs of the email queue rows
         
     Returns:
-        True if update succeeded, False otherwise
+        True if the update succeeded, False otherwise
     """
+    if not email_ids:
+        return True
     try:
         # Store sent_at in UTC
         sent_at_utc = datetime.now(ZoneInfo("UTC"))
-        response = (
+        (
             supabase.table("email_queue")
             .update({
                 "status": "sent",
                 "sent_at": sent_at_utc.isoformat(),
-            })
-            .eq("id", email_id)
+            }, returning=ReturnMethod.minimal)
+            .in_("id", email_ids)
             .execute()
         )
-        return len(response.data) > 0
+        return True
+    except Exception:
+        return False
+
+
+def mark_failed_batch(supabase: Client, email_ids: List[str], error_message: str) -> bool:
+    """Mark several emails as failed with the same error in one statement.
+    
+    Args:
+        supabase: Supabase client instance
+        email_ids: IDs of the email queue rows
+        error_message: Error message to store
+        
+    Returns:
+        True if the update succeeded, False otherwise
+    """
+    if not email_ids:
+        return True
+    try:
+        (
+            supabase.table("email_queue")
+            .update({
+                "status": "failed",
+                "error_message": error_message,
+            }, returning=ReturnMethod.minimal)
+            .in_("id", email_ids)
+            .execute()
+        )
+        return True
+    except Exception:
+        return False
+
+
+def mark_queued_batch(supabase: Client, email_ids: List[str]) -> bool:
+    """Put several locked emails back in the queue, releasing the lock.
+    
+    Args:
+        supabase: Supabase client instance
+        email_ids: IDs of the email queue rows
+        
+    Returns:
+        True if the update succeeded, False otherwise
+    """
+    if not email_ids:
+        return True
+    try:
+        (
+            supabase.table("email_queue")
+            .update({"status": "queued"}, returning=ReturnMethod.minimal)
+            .in_("id", email_ids)
+            .eq("status", "processing")
+            .execute()
+        )
+        return True
     except Exception:
         return False
 
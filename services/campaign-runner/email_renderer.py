@@ -2,11 +2,13 @@
 
 import hmac
 import hashlib
+import html
 import re
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlencode
 
-from config import Config
+from config import settings
 
 
 # Brand colors matching OutreachMarketing template
@@ -22,6 +24,61 @@ BRAND = {
     'border': '#e5e7eb',
 }
 
+_VAR_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+def _unchanged(content: str) -> str:
+    return content
+
+
+def build_replacer(
+    data: Optional[Dict[str, str]],
+    escape_html: bool = False,
+) -> Callable[[str], str]:
+    """Return a function that replaces {{variable}} placeholders from data.
+    
+    Each variable is resolved against data once and remembered, so rendering
+    several sections for the same recipient does not repeat the lookups.
+    
+    Args:
+        data: Dictionary of values to replace
+        escape_html: HTML-escape substituted values (recipient data is
+            untrusted); the surrounding content is left as authored
+        
+    Returns:
+        Callable taking text content and returning it with replaced variables
+    """
+    if not data:
+        return _unchanged
+    
+    resolved: Dict[str, str] = {}
+    
+    def replacer(match):
+        variable = match.group(1)
+        value = resolved.get(variable)
+        if value is None:
+            # Check exact, lower, upper
+            val = (
+                data.get(variable) or 
+                data.get(variable.lower()) or 
+                data.get(variable.upper())
+            )
+            if val is None:
+                value = match.group(0)
+            elif escape_html:
+                value = html.escape(str(val))
+            else:
+                value = str(val)
+            resolved[variable] = value
+        return value
+    
+    def replace(content: str) -> str:
+        if "{{" not in content:
+            return content
+        return _VAR_RE.sub(replacer, content)
+    
+    return replace
+
 
 def replace_variables(content: str, data: Optional[Dict[str, str]]) -> str:
     """Replace {{variable}} placeholders with data values.
@@ -33,20 +90,20 @@ def replace_variables(content: str, data: Optional[Dict[str, str]]) -> str:
     Returns:
         String with replaced variables
     """
-    if not data:
+    if not data or "{{" not in content:
         return content
-        
-    def replacer(match):
-        variable = match.group(1)
-        # Check exact, lower, upper
-        val = (
-            data.get(variable) or 
-            data.get(variable.lower()) or 
-            data.get(variable.upper())
-        )
-        return str(val) if val is not None else match.group(0)
-        
-    return re.sub(r'\{\{(\w+)\}\}', replacer, content)
+    return build_replacer(data)(content)
+
+
+@lru_cache(maxsize=100_000)
+def _unsub_token(email_lower: str) -> str:
+    """Return the unsubscribe token for a lower-cased address.
+
+    The secret is fixed for the life of the process; call
+    ``_unsub_token.cache_clear()`` if it is ever rotated at runtime.
+    """
+    secret = settings.UNSUBSCRIBE_SECRET.encode('utf-8')
+    return hmac.new(secret, email_lower.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
 
 
 def generate_unsubscribe_url(email: str, campaign_id: Optional[str] = None) -> str:
@@ -59,10 +116,7 @@ def generate_unsubscribe_url(email: str, campaign_id: Optional[str] = None) -> s
     Returns:
         Full unsubscribe URL
     """
-    secret = Config.UNSUBSCRIBE_SECRET.encode('utf-8')
-    msg = email.lower().encode('utf-8')
-    
-    token = hmac.new(secret, msg, hashlib.sha256).hexdigest()[:16]
+    token = _unsub_token(email.lower())
     
     # Base URL hardcoded or from config? 
     # For now assuming prod/dev distinction handled via env or hardcoded as per TS file default
@@ -86,54 +140,12 @@ def generate_unsubscribe_url(email: str, campaign_id: Optional[str] = None) -> s
     return f"{base_url}/api/unsubscribe?{params}"
 
 
-def generate_email_html(
-    sections: List[Dict[str, Any]],
-    subject_line: str,
-    recipient_data: Dict[str, Any],
-    generated_content: Optional[Dict[str, str]] = None,
-    campaign_id: Optional[str] = None
-) -> str:
-    """Generate the full email HTML.
-    
-    Args:
-        sections: List of section definitions
-        subject_line: Email subject
-        recipient_data: CSV row data for variable replacement
-        generated_content: Map of section_id -> generated text (from AI)
-        
-    Returns:
-        Full HTML string
-    """
-    processed_subject = replace_variables(subject_line, recipient_data)
-    cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
-    unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
-    
-    sections_html_parts = []
-    
-    for section in sections:
-        s_type = section.get('type', 'text')
-        s_mode = section.get('mode', 'static')
-        s_id = section.get('id', '')
-        s_name = section.get('name', '')
-        s_content = section.get('content', '')
-        s_button_url = section.get('buttonUrl', '#')
-        
-        if s_type == 'button':
-            # CTA Button
-            button_text = s_content
-            if s_mode == 'personalized':
-                # Rare case, but if button text is personalized
-                if generated_content and s_id in generated_content:
-                    button_text = generated_content[s_id]
-                else:
-                    button_text = f"[{s_name} - AI Generated]"
-            else:
-                button_text = replace_variables(s_content, recipient_data)
-                
-            sections_html_parts.append(f'''
+# Markup fragments with BRAND colors baked in at import time; only the
+# per-recipient values are substituted while rendering.
+_BUTTON_TEMPLATE = '''
         <div style="margin: 24px 0; text-align: center;">
-          <a href="{s_button_url}" style="
-            background-color: {BRAND['primary']};
+          <a href="{{url}}" style="
+            background-color: {brand[primary]};
             color: #ffffff;
             padding: 14px 32px;
             border-radius: 8px;
@@ -144,53 +156,29 @@ def generate_email_html(
             font-weight: 600;
             font-size: 16px;
             text-align: center;
-          ">{button_text}</a>
+          ">{{text}}</a>
         </div>
-            ''')
-            
-        else:
-            # Text Section
-            final_text = ""
-            
-            if s_mode == 'personalized':
-                if generated_content and s_id in generated_content:
-                    final_text = generated_content[s_id]
-                else:
-                    # Fallback if no content generated (shouldn't happen in prod flow)
-                    final_text = f"[{s_name} - Missing Content]" 
-            else:
-                final_text = replace_variables(s_content, recipient_data)
-                
-            # Formatting (Line breaks to <br>)
-            # TypeScript used split.map.join
-            paragraphs = final_text.split('\n\n')
-            p_htmls = []
-            for p in paragraphs:
-                processed = p.replace('\n', '<br>')
-                # Simple bold replacement if needed, but usually AI returns plain text or we allow markdown-ish?
-                # The TS code did some regex replacing for <strong> and <a href>.
-                # We can replicate that simply.
-                processed = re.sub(r'<strong>(.*?)</strong>', r'<strong>\1</strong>', processed)
-                # Link handling might stay as is if user inputs HTML, but primarily we expect plain text from AI
-                
-                p_htmls.append(f'<p style="margin: 0 0 16px 0; font-size: 15px; color: {BRAND["textMuted"]}; line-height: 1.6;">{processed}</p>')
-                
-            sections_html_parts.append(''.join(p_htmls))
-            
-    sections_html = ''.join(sections_html_parts)
-    
-    # Full Template
-    return f'''
+            '''.format(brand=BRAND)
+
+_PARAGRAPH_OPEN = (
+    '<p style="margin: 0 0 16px 0; font-size: 15px; color: {brand[textMuted]}; line-height: 1.6;">'
+).format(brand=BRAND)
+_PARAGRAPH_CLOSE = '</p>'
+
+_EMPTY_SECTIONS_HTML = '<p style="color: #9ca3af; font-style: italic;">No content available</p>'
+
+# Full Template
+_LAYOUT_TEMPLATE = '''
 <!DOCTYPE html>
 <html>
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{processed_subject}</title>
+  <title>{{subject}}</title>
 </head>
 <body style="
   font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif, 'Apple Color Emoji', 'Segoe UI Emoji', 'Segoe UI Symbol';
-  background-color: {BRAND['bgLight']};
+  background-color: {brand[bgLight]};
   margin: 0;
   padding: 16px 0;
   font-size: 15px;
@@ -200,15 +188,15 @@ def generate_email_html(
     width: 100%;
     max-width: 640px;
     margin: 0 auto;
-    background-color: {BRAND['bgCard']};
+    background-color: {brand[bgCard]};
     border-radius: 16px;
-    border: 1px solid {BRAND['border']};
+    border: 1px solid {brand[border]};
     overflow: hidden;
     box-shadow: 0 18px 45px rgba(15, 23, 42, 0.08), 0 8px 20px rgba(15, 23, 42, 0.06);
   ">
     <!-- Header -->
     <div style="
-      background-color: {BRAND['primary']};
+      background-color: {brand[primary]};
       padding: 18px 20px;
     ">
       <table cellpadding="0" cellspacing="0" border="0" width="100%">
@@ -228,7 +216,7 @@ def generate_email_html(
               font-size: 11px;
               letter-spacing: 0.14em;
               text-transform: uppercase;
-              color: {BRAND['primaryLight']};
+              color: {brand[primaryLight]};
             ">OZListings</div>
             <div style="
               margin: 2px 0 0 0;
@@ -236,7 +224,7 @@ def generate_email_html(
               line-height: 1.4;
               color: #ffffff;
               font-weight: 800;
-            ">{processed_subject or 'Email Preview'}</div>
+            ">{{heading}}</div>
           </td>
         </tr>
       </table>
@@ -244,28 +232,28 @@ def generate_email_html(
 
     <!-- Main Content -->
     <div style="padding: 20px 20px 18px 20px;">
-      {sections_html or '<p style="color: #9ca3af; font-style: italic;">No content available</p>'}
+      {{sections}}
     </div>
 
     <!-- Footer -->
     <div style="
-      border-top: 1px solid {BRAND['border']};
+      border-top: 1px solid {brand[border]};
       padding: 12px 24px 20px 24px;
-      background-color: {BRAND['bgFooter']};
+      background-color: {brand[bgFooter]};
     ">
       <p style="
         margin: 0 0 4px 0;
         font-size: 11px;
-        color: {BRAND['textLight']};
+        color: {brand[textLight]};
       ">
         This email was sent to you because you're listed as a developer with
         an Opportunity Zone project. If you'd prefer not to receive these
-        emails, you can <a href="{unsubscribe_url}" style="color: {BRAND['primary']}; text-decoration: underline;">unsubscribe</a>.
+        emails, you can <a href="{{unsubscribe_url}}" style="color: {brand[primary]}; text-decoration: underline;">unsubscribe</a>.
       </p>
       <p style="
         margin: 0;
         font-size: 11px;
-        color: {BRAND['textLight']};
+        color: {brand[textLight]};
       ">
         © 2024 OZListings. All rights reserved.
       </p>
@@ -273,7 +261,88 @@ def generate_email_html(
   </div>
 </body>
 </html>
-'''
+'''.format(brand=BRAND)
+
+
+def generate_email_html(
+    sections: List[Dict[str, Any]],
+    subject_line: str,
+    recipient_data: Dict[str, Any],
+    generated_content: Optional[Dict[str, str]] = None,
+    campaign_id: Optional[str] = None
+) -> str:
+    """Generate the full email HTML.
+    
+    Args:
+        sections: List of section definitions
+        subject_line: Email subject
+        recipient_data: CSV row data for variable replacement
+        generated_content: Map of section_id -> generated text (from AI)
+        
+    Returns:
+        Full HTML string
+    """
+    replace = build_replacer(recipient_data, escape_html=True)
+    processed_subject = replace(subject_line)
+    cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
+    unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
+    
+    html_parts: List[str] = []
+    
+    for section in sections:
+        s_type = section.get('type', 'text')
+        s_mode = section.get('mode', 'static')
+        s_id = section.get('id', '')
+        s_name = section.get('name', '')
+        s_content = section.get('content', '')
+        s_button_url = section.get('buttonUrl', '#')
+        
+        if s_type == 'button':
+            # CTA Button
+            button_text = s_content
+            if s_mode == 'personalized':
+                # Rare case, but if button text is personalized
+                if generated_content and s_id in generated_content:
+                    button_text = generated_content[s_id]
+                else:
+                    button_text = f"[{s_name} - AI Generated]"
+            else:
+                button_text = replace(s_content)
+                
+            html_parts.append(_BUTTON_TEMPLATE.format(url=s_button_url, text=button_text))
+            
+        else:
+            # Text Section
+            final_text = ""
+            
+            if s_mode == 'personalized':
+                if generated_content and s_id in generated_content:
+                    final_text = generated_content[s_id]
+                else:
+                    # Fallback if no content generated (shouldn't happen in prod flow)
+                    final_text = f"[{s_name} - Missing Content]" 
+            else:
+                final_text = replace(s_content)
+                
+            # Formatting (Line breaks to <br>)
+            # TypeScript used split.map.join
+            paragraphs = final_text.split('\n\n')
+            for p in paragraphs:
+                processed = p.replace('\n', '<br>')
+                
+                html_parts.append(_PARAGRAPH_OPEN)
+                html_parts.append(processed)
+                html_parts.append(_PARAGRAPH_CLOSE)
+            
+    sections_html = ''.join(html_parts)
+    
+    # Full Template
+    return _LAYOUT_TEMPLATE.format(
+        subject=processed_subject,
+        heading=processed_subject or 'Email Preview',
+        sections=sections_html or _EMPTY_SECTIONS_HTML,
+        unsubscribe_url=unsubscribe_url,
+    )
 
 
 def generate_email_text(
@@ -284,7 +353,8 @@ def generate_email_text(
     campaign_id: Optional[str] = None
 ) -> str:
     """Generate a plain text email body."""
-    processed_subject = replace_variables(subject_line, recipient_data)
+    replace = build_replacer(recipient_data)
+    processed_subject = replace(subject_line)
     cid = campaign_id or recipient_data.get('campaign_id') or recipient_data.get('campaignId')
     unsubscribe_url = generate_unsubscribe_url(recipient_data.get('Email', ''), campaign_id=cid)
 
@@ -308,7 +378,7 @@ def generate_email_text(
                     else f"[{s_name} - AI Generated]"
                 )
             else:
-                button_text = replace_variables(s_content, recipient_data)
+                button_text = replace(s_content)
 
             lines.append(f"{button_text} -> {s_button_url or 'https://'}")
             continue
@@ -321,7 +391,7 @@ def generate_email_text(
                 else f"[{s_name} - Missing Content]"
             )
         else:
-            final_text = replace_variables(s_content, recipient_data)
+            final_text = replace(s_content)
 
         # Preserve paragraph breaks with blank lines
         paragraphs = final_text.split('\n\n')
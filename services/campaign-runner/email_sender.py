@@ -2,137 +2,163 @@
 
 import logging
 import re
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, List
 
 import httpx
+import orjson
 
-from config import Config
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 SPARKPOST_TRANSMISSIONS_URL = "https://api.sparkpost.com/api/v1/transmissions"
 
+_SPARKPOST_LIMITS = httpx.Limits(
+    max_keepalive_connections=50,
+    max_connections=100,
+    keepalive_expiry=30,
+)
 
-async def send_sparkpost_email(
-    to_email: str,
+# Characters that might break SparkPost campaign ids; keep only alphanumeric,
+# spaces, hyphens, underscores
+_CAMPAIGN_NAME_RE = re.compile(r'[^a-zA-Z0-9\s\-_]')
+
+SPARKPOST_REPLY_TO = "communications@ozlistings.com"
+# Transmission options shared by every send; serialized, never mutated
+_SPARKPOST_OPTIONS = {"click_tracking": False}
+# Failed-send log lines keep only the start of SparkPost's response body
+_MAX_LOGGED_RESPONSE_CHARS = 512
+
+
+@lru_cache(maxsize=1)
+def get_sparkpost_client() -> httpx.AsyncClient:
+    """Return the worker-wide SparkPost client.
+
+    Created on first send inside the running event loop and reused so sends
+    share pooled keep-alive connections; closed by ``close_sparkpost_client()``.
+    """
+    return httpx.AsyncClient(
+        timeout=10,
+        headers={
+            "Authorization": settings.SPARKPOST_API_KEY,
+            "Content-Type": "application/json",
+        },
+        limits=_SPARKPOST_LIMITS,
+    )
+
+
+async def close_sparkpost_client() -> None:
+    """Close the cached SparkPost client, if one was created."""
+    if get_sparkpost_client.cache_info().currsize:
+        await get_sparkpost_client().aclose()
+    get_sparkpost_client.cache_clear()
+
+
+def _sparkpost_campaign_id(campaign_id: str, campaign_name: str | None) -> str:
+    """Format the transmission campaign_id as "campaign_name - uuid".
+
+    The name makes campaigns readable in the SparkPost dashboard; webhooks
+    recover the UUID from the part after the last " - ".
+    """
+    if not campaign_name:
+        return campaign_id
+    # Sanitize campaign name (max 64 bytes total) and truncate so that
+    # name + " - " + uuid (36 chars) fits: name can be max 25 chars
+    sanitized_name = _CAMPAIGN_NAME_RE.sub('', campaign_name)[:25]
+    return f"{sanitized_name} - {campaign_id}"
+
+
+# SparkPost accepts at most this many recipients per transmission
+SPARKPOST_MAX_RECIPIENTS = 1000
+
+
+async def send_sparkpost_batch(
     from_email: str,
-    subject: str,
-    body: str,
+    recipients: List[Dict[str, Any]],
+    is_html: bool = True,
     campaign_id: str | None = None,
     campaign_name: str | None = None,
-    metadata: Dict[str, Any] | None = None,
 ) -> bool:
-    """Send an email via SparkPost transmissions API.
+    """Send already-rendered emails that share a sender in one transmission.
+
+    Each recipient's own subject and body travel as substitution data into a
+    ``{{subject}}`` / ``{{{body}}}`` content shell, so one POST replaces a
+    request per email. The caller keeps batches within
+    ``SPARKPOST_MAX_RECIPIENTS``.
 
     Args:
-        to_email: Recipient email address
-        from_email: Sender email address (e.g., "jeff@connect-ozlistings.com")
-        subject: Email subject line
-        body: Email body (HTML or text)
+        from_email: Sender shared by every email in the batch
+        recipients: Dicts with ``to_email``, ``subject``, ``body`` and
+            optional ``metadata``
+        is_html: Whether the bodies are HTML (otherwise plain text)
         campaign_id: Campaign UUID for tracking
         campaign_name: Campaign name for readable SparkPost campaign_id
-        metadata: Optional metadata to attach to the email
 
     Returns:
         True if the API call succeeded (2xx), False otherwise.
     """
-    if not Config.SPARKPOST_API_KEY:
+    if not settings.SPARKPOST_API_KEY:
         logger.error(
             "[sparkpost] SPARKPOST_API_KEY is not configured; cannot send email",
-            extra={"to": to_email, "subject": subject, "from": from_email},
+            extra={"from": from_email, "count": len(recipients)},
         )
         return False
 
-    # Determine if body is HTML or plain text
-    is_html = "<" in body and ">" in body
-    text_body = body if not is_html else None
-    html_body = body if is_html else None
-
     payload: Dict[str, Any] = {
-        "recipients": [{"address": {"email": to_email}}],
+        "recipients": [
+            {
+                "address": {"email": r["to_email"]},
+                "substitution_data": {"subject": r["subject"], "body": r["body"]},
+                **({"metadata": r["metadata"]} if r.get("metadata") else {}),
+            }
+            for r in recipients
+        ],
         "content": {
             "from": from_email,
-            "subject": subject,
-            "reply_to": "communications@ozlistings.com",
-        },
-        "options": {
-            "click_tracking": False,
+            "subject": "{{subject}}",
+            "reply_to": SPARKPOST_REPLY_TO,
+            # Triple braces insert the pre-rendered body without escaping
+            ("html" if is_html else "text"): "{{{body}}}",
         },
+        "options": _SPARKPOST_OPTIONS,
     }
-
-    # Add campaign_id at transmission level for Metrics API tracking
-    # Format: "campaign_name - uuid" for readability in SparkPost dashboard
     if campaign_id:
-        if campaign_name:
-            # Sanitize campaign name: remove special chars that might break SparkPost (max 64 bytes total)
-            # Keep only alphanumeric, spaces, hyphens, underscores
-            sanitized_name = re.sub(r'[^a-zA-Z0-9\s\-_]', '', campaign_name)
-            # Truncate if needed to ensure total length (name + " - " + uuid) <= 64 bytes
-            # UUID is 36 chars, " - " is 3 chars, so name can be max 25 chars
-            max_name_len = 25
-            if len(sanitized_name) > max_name_len:
-                sanitized_name = sanitized_name[:max_name_len]
-            sparkpost_campaign_id = f"{sanitized_name} - {campaign_id}"
-        else:
-            sparkpost_campaign_id = campaign_id
-        payload["campaign_id"] = sparkpost_campaign_id
-
-    if html_body:
-        payload["content"]["html"] = html_body
-    if text_body:
-        payload["content"]["text"] = text_body
-
-    if metadata:
-        payload["metadata"] = metadata
+        payload["campaign_id"] = _sparkpost_campaign_id(campaign_id, campaign_name)
 
     logger.info(
-        "[sparkpost] Sending email",
-        extra={
-            "to": to_email,
-            "from": from_email,
-            "subject": subject,
-            "metadata": metadata or {},
-        },
+        "[sparkpost] Sending batch",
+        extra={"from": from_email, "count": len(recipients), "campaign_id": campaign_id},
     )
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(
-                SPARKPOST_TRANSMISSIONS_URL,
-                json=payload,
-                headers={
-                    "Authorization": Config.SPARKPOST_API_KEY,
-                    "Content-Type": "application/json",
-                },
-            )
+        response = await get_sparkpost_client().post(SPARKPOST_TRANSMISSIONS_URL, content=orjson.dumps(payload))
 
         if response.is_success:
             logger.info(
-                "[sparkpost] Email sent successfully",
-                extra={"to": to_email, "from": from_email, "subject": subject},
+                "[sparkpost] Batch sent successfully",
+                extra={"from": from_email, "count": len(recipients)},
             )
             return True
 
+        # The runner's log format drops extras, so keep the response in the message
         logger.error(
-            "[sparkpost] Failed to send email",
+            "[sparkpost] Failed to send batch of %d from %s: HTTP %d %s",
+            len(recipients),
+            from_email,
+            response.status_code,
+            response.text[:_MAX_LOGGED_RESPONSE_CHARS],
             extra={
-                "to": to_email,
                 "from": from_email,
-                "subject": subject,
+                "count": len(recipients),
                 "status_code": response.status_code,
-                "response": response.text,
+                "response": response.text[:_MAX_LOGGED_RESPONSE_CHARS],
             },
         )
         return False
     except Exception as exc:
         logger.exception(
-            "[sparkpost] Exception while sending email",
-            extra={
-                "to": to_email,
-                "from": from_email,
-                "subject": subject,
-                "error": str(exc),
-            },
+            "[sparkpost] Exception while sending batch",
+            extra={"from": from_email, "count": len(recipients), "error": str(exc)},
         )
         return False
-
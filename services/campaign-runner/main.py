@@ -17,18 +17,20 @@ from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from collections import defaultdict
 
-from config import Config
+from config import settings
 from db import (
-    get_supabase_client, 
-    get_queued_emails, 
-    mark_processing, 
-    mark_sent, 
+    get_supabase_client,
+    get_queued_emails,
+    mark_processing_batch,
+    mark_sent_batch,
     mark_failed,
+    mark_failed_batch,
+    mark_queued_batch,
     get_campaign,
     update_generated_body,
     pause_campaign
 )
-from email_sender import send_sparkpost_email
+from email_sender import SPARKPOST_MAX_RECIPIENTS, close_sparkpost_client, send_sparkpost_batch
 import prompts
 import email_renderer
 
@@ -39,10 +41,10 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger("campaign_runner")
-logger.setLevel(getattr(logging, Config.LOG_LEVEL, logging.INFO))
+logger.setLevel(getattr(logging, settings.LOG_LEVEL, logging.INFO))
 
 _handler = logging.StreamHandler()
-_handler.setLevel(getattr(logging, Config.LOG_LEVEL, logging.INFO))
+_handler.setLevel(getattr(logging, settings.LOG_LEVEL, logging.INFO))
 _handler.setFormatter(
     logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
 )
@@ -52,6 +54,7 @@ logger.propagate = False
 
 # Batch processing configuration
 BATCH_SIZE = 20
+GENERATION_BATCH_SIZE = 10  # Recipients per batched Groq call
 POLL_INTERVAL_SECONDS = 60
 CIRCUIT_BREAKER_THRESHOLD = 10  # Consecutive errors to pause campaign
 
@@ -64,13 +67,13 @@ def is_working_hours() -> bool:
         or if DISABLE_WORKING_HOURS is set to True.
     """
     # If working hours restrictions are disabled, always return True
-    if Config.DISABLE_WORKING_HOURS:
+    if settings.DISABLE_WORKING_HOURS:
         return True
 
     try:
-        tz = ZoneInfo(Config.TIMEZONE)
+        tz = ZoneInfo(settings.TIMEZONE)
     except Exception as e:
-        logger.warning(f"Invalid timezone '{Config.TIMEZONE}', falling back to UTC: {e}")
+        logger.warning(f"Invalid timezone '{settings.TIMEZONE}', falling back to UTC: {e}")
         tz = ZoneInfo("UTC")
 
     # Get current time in the configured timezone
@@ -86,165 +89,236 @@ async def process_email_batch():
     except Exception as e:
         logger.error(f"Failed to create Supabase client: {e}")
         return
-    
+
     try:
         # Fetch queued emails (filtering out paused campaigns)
         emails = get_queued_emails(supabase, limit=BATCH_SIZE)
     except Exception as e:
         logger.error(f"Failed to fetch queued emails: {e}", exc_info=True)
         return
-    
+
     if not emails:
         logger.debug("No queued emails found")
         return
-    
+
     logger.info(f"Processing batch of {len(emails)} emails")
-    
+
     processed_count = 0
     sent_count = 0
     failed_count = 0
-    
+
     # Track errors per campaign for Circuit Breaker
     campaign_errors = defaultdict(int)
     paused_campaigns = set()
-    
+
+    # Campaign rows fetched in this batch, shared by generation and sending
+    campaigns_by_id = {}
+
+    def load_campaign(campaign_id):
+        if campaign_id not in campaigns_by_id:
+            campaigns_by_id[campaign_id] = get_campaign(supabase, campaign_id)
+        return campaigns_by_id[campaign_id]
+
+    # Rendered emails awaiting send, keyed by (campaign_id, from_email, is_html)
+    ready_to_send = defaultdict(list)
+
+    def queue_for_send(email, body):
+        # Emails sharing a campaign and sender go out together as one
+        # SparkPost transmission
+        is_html = "<" in body and ">" in body
+        ready_to_send[(email["campaign_id"], email.get("from_email"), is_html)].append({
+            "email_id": email["id"],
+            "to_email": email["to_email"],
+            "subject": email.get("subject"),
+            "body": body,
+            "metadata": {"campaign_id": email["campaign_id"], "email_id": email["id"]},
+        })
+
+    def record_generation_failure(email_ids, campaign_id, error_msg):
+        nonlocal failed_count
+        logger.error(f"Generation failed for {', '.join(email_ids)}: {error_msg}")
+
+        # Increment error count, once per email as when each was generated alone
+        campaign_errors[campaign_id] += len(email_ids)
+
+        # Check Circuit Breaker
+        if campaign_errors[campaign_id] >= CIRCUIT_BREAKER_THRESHOLD and campaign_id not in paused_campaigns:
+            logger.critical(f"PAUSING Campaign {campaign_id} due to {campaign_errors[campaign_id]} consecutive errors")
+            pause_success = pause_campaign(supabase, campaign_id, reason=f"High Failure Rate: {error_msg}")
+            if pause_success:
+                paused_campaigns.add(campaign_id)
+
+        # Handle Retry (Push to End + Jitter?)
+        # For now, just mark Failed. The plan mentions Jitter retry for 429s.
+        # Assuming generic failure for now.
+        mark_failed_batch(supabase, email_ids, f"Generation Error: {error_msg}")
+        failed_count += len(email_ids)
+
+    def lock(batch):
+        # Mark as processing (acts as lock), one statement for the batch
+        claimed = mark_processing_batch(supabase, [email["id"] for email in batch])
+        if len(claimed) < len(batch):
+            logger.debug(f"{len(batch) - len(claimed)} emails already being processed, skipping")
+        return [email for email in batch if email["id"] in claimed]
+
+    # Emails with empty bodies, grouped by campaign for batched generation
+    needs_generation = defaultdict(list)
+    # Emails whose body is ready, locked together below
+    has_body = []
+
     for email in emails:
         email_id = email.get("id")
         campaign_id = email.get("campaign_id")
         to_email = email.get("to_email")
-        from_email = email.get("from_email")
-        subject = email.get("subject")
-        body = email.get("body")
-        metadata = email.get("metadata") or {}
-        
-        # Skip if campaign was just paused in this batch
-        if campaign_id in paused_campaigns:
-            continue
-            
+
         # Basic validation
         if not all([email_id, campaign_id, to_email]):
             logger.warning(f"Email {email_id} missing ID/Campaign/To, skipping")
             mark_failed(supabase, email_id, "Missing core fields")
             failed_count += 1
             continue
-        
-        # Mark as processing (acts as lock)
-        try:
-            if not mark_processing(supabase, email_id):
-                logger.debug(f"Email {email_id} already being processed, skipping")
-                continue
-        except Exception:
+
+        if not email.get("body"):
+            needs_generation[campaign_id].append(email)
             continue
-            
+
+        has_body.append(email)
+
+    for email in lock(has_body):
         processed_count += 1
-        
-        # --- Just-in-Time Generation ---
-        if not body:
+        queue_for_send(email, email["body"])
+
+    # --- Just-in-Time Generation ---
+    for campaign_id, pending in needs_generation.items():
+        personalized_sections = None
+        prompt_context = None
+
+        for start in range(0, len(pending), GENERATION_BATCH_SIZE):
+            # Skip the rest of a campaign paused in this batch; its emails
+            # were not locked yet and stay queued
+            if campaign_id in paused_campaigns:
+                break
+
+            locked = lock(pending[start:start + GENERATION_BATCH_SIZE])
+            if not locked:
+                continue
+            processed_count += len(locked)
+
             try:
-                logger.info(f"Generating content for email {email_id} (Campaign {campaign_id})")
-                
+                logger.info(f"Generating content for {len(locked)} emails (Campaign {campaign_id})")
+
                 # 1. Fetch Campaign Sections
-                campaign = get_campaign(supabase, campaign_id)
+                campaign = load_campaign(campaign_id)
                 if not campaign:
                     raise ValueError(f"Campaign {campaign_id} not found")
-                
+
                 sections = campaign.get("sections", [])
-                email_format = (campaign.get("email_format") or "html").lower()
-                
-                # 2. Generate AI Content (Structured keys)
-                generated_content = prompts.generate_content(sections, metadata)
-                
-                # 3. Render body according to campaign format (html default)
-                # Note: campaign['subject'] is an object {mode, content}, but email_queue has 'subject' string
-                # We use the pre-resolved subject from email_queue if available
-                if email_format == "text":
-                    final_body = email_renderer.generate_email_text(
-                        sections=sections,
-                        subject_line=subject,
-                        recipient_data=metadata,
-                        generated_content=generated_content,
-                        campaign_id=campaign_id
+                if personalized_sections is None:
+                    # Same for every chunk of the campaign; campaigns without
+                    # personalized sections never reach Groq
+                    personalized_sections = [s for s in sections if s.get("mode") == "personalized"]
+                    if personalized_sections:
+                        prompt_context = prompts.build_prompt_context(sections, personalized_sections)
+
+                # 2. Generate AI Content (Structured keys), one call per batch
+                if personalized_sections:
+                    batch_content = prompts.generate_content_batch(
+                        sections, [email.get("metadata") or {} for email in locked], prompt_context
                     )
                 else:
-                    final_body = email_renderer.generate_email_html(
-                        sections=sections,
-                        subject_line=subject,
-                        recipient_data=metadata,
-                        generated_content=generated_content,
-                        campaign_id=campaign_id
-                    )
-                
-                # 4. Save to DB
-                if not update_generated_body(supabase, email_id, final_body):
-                    raise RuntimeError("Failed to save generated body")
-                
-                body = final_body # Update local var for sending
-                
-                # Reset error count on success
-                campaign_errors[campaign_id] = 0
-                
+                    batch_content = [{} for _ in locked]
             except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Generation failed for {email_id}: {error_msg}")
-                
-                # Increment error count
-                campaign_errors[campaign_id] += 1
-                
-                # Check Circuit Breaker
-                if campaign_errors[campaign_id] >= CIRCUIT_BREAKER_THRESHOLD:
-                    logger.critical(f"PAUSING Campaign {campaign_id} due to {campaign_errors[campaign_id]} consecutive errors")
-                    pause_success = pause_campaign(supabase, campaign_id, reason=f"High Failure Rate: {error_msg}")
-                    if pause_success:
-                        paused_campaigns.add(campaign_id)
-                
-                # Handle Retry (Push to End + Jitter?)
-                # For now, just mark Failed. The plan mentions Jitter retry for 429s.
-                # Assuming generic failure for now.
-                mark_failed(supabase, email_id, f"Generation Error: {error_msg}")
-                failed_count += 1
+                record_generation_failure([email["id"] for email in locked], campaign_id, str(e))
                 continue
-        
-        # --- Sending ---
-        if not body:
-            # Should not happen after generation, but safety check
-            mark_failed(supabase, email_id, "Body is empty after generation")
-            failed_count += 1
+
+            email_format = (campaign.get("email_format") or "html").lower()
+
+            for email, generated_content in zip(locked, batch_content):
+                email_id = email["id"]
+                try:
+                    if generated_content is None:
+                        raise ValueError("No content generated for recipient")
+
+                    # 3. Render body according to campaign format (html default)
+                    # Note: campaign['subject'] is an object {mode, content}, but email_queue has 'subject' string
+                    # We use the pre-resolved subject from email_queue if available
+                    if email_format == "text":
+                        final_body = email_renderer.generate_email_text(
+                            sections=sections,
+                            subject_line=email.get("subject"),
+                            recipient_data=email.get("metadata") or {},
+                            generated_content=generated_content,
+                            campaign_id=campaign_id
+                        )
+                    else:
+                        final_body = email_renderer.generate_email_html(
+                            sections=sections,
+                            subject_line=email.get("subject"),
+                            recipient_data=email.get("metadata") or {},
+                            generated_content=generated_content,
+                            campaign_id=campaign_id
+                        )
+
+                    # 4. Save to DB
+                    if not update_generated_body(supabase, email_id, final_body):
+                        raise RuntimeError("Failed to save generated body")
+
+                    # Reset error count on success
+                    campaign_errors[campaign_id] = 0
+
+                except Exception as e:
+                    record_generation_failure([email_id], campaign_id, str(e))
+                    continue
+
+                if not final_body:
+                    # Should not happen after generation, but safety check
+                    mark_failed(supabase, email_id, "Body is empty after generation")
+                    failed_count += 1
+                    continue
+
+                queue_for_send(email, final_body)
+
+    # --- Sending ---
+    for (campaign_id, from_email, is_html), group in ready_to_send.items():
+        # Campaign paused by the circuit breaker in this batch: send none of
+        # its emails and put them back in the (now paused) queue
+        if campaign_id in paused_campaigns:
+            mark_queued_batch(supabase, [item["email_id"] for item in group])
             continue
-        
+
         # Get campaign name for readable SparkPost campaign_id
-        campaign_name = None
-        if campaign_id:
+        # (if we can't get it, just use the UUID)
+        campaign = load_campaign(campaign_id)
+        campaign_name = campaign.get("name") if campaign else None
+
+        for start in range(0, len(group), SPARKPOST_MAX_RECIPIENTS):
+            chunk = group[start:start + SPARKPOST_MAX_RECIPIENTS]
+            error_message = "SparkPost API Error"
             try:
-                campaign = get_campaign(supabase, campaign_id)
-                if campaign:
-                    campaign_name = campaign.get("name")
-            except Exception:
-                # If we can't get campaign name, just use UUID
-                pass
-            
-        try:
-            success = await send_sparkpost_email(
-                to_email=to_email,
-                from_email=from_email,
-                subject=subject,
-                body=body,
-                campaign_id=campaign_id,
-                campaign_name=campaign_name,
-                metadata={"campaign_id": campaign_id, "email_id": email_id}
-            )
-            
+                success = await send_sparkpost_batch(
+                    from_email=from_email,
+                    recipients=chunk,
+                    is_html=is_html,
+                    campaign_id=campaign_id,
+                    campaign_name=campaign_name,
+                )
+            except Exception as e:
+                logger.error(f"Sending failed for batch of {len(chunk)} in campaign {campaign_id}: {e}")
+                success = False
+                error_message = f"Sending Error: {str(e)}"
+            if not success:
+                # send_sparkpost_batch logs the SparkPost response for the chunk
+                logger.error(f"Marking {len(chunk)} emails failed in campaign {campaign_id}: {error_message}")
+
+            # One status update for the whole transmission
+            chunk_ids = [item["email_id"] for item in chunk]
             if success:
-                mark_sent(supabase, email_id)
-                sent_count += 1
+                mark_sent_batch(supabase, chunk_ids)
+                sent_count += len(chunk)
             else:
-                mark_failed(supabase, email_id, "SparkPost API Error")
-                failed_count += 1
-                
-        except Exception as e:
-            logger.error(f"Sending failed for {email_id}: {e}")
-            mark_failed(supabase, email_id, f"Sending Error: {str(e)}")
-            failed_count += 1
-            
+                mark_failed_batch(supabase, chunk_ids, error_message)
+                failed_count += len(chunk)
+
     logger.info(
         f"Batch complete: {processed_count} processed, {sent_count} sent, {failed_count} failed",
         extra={"paused_campaigns": list(paused_campaigns)}
@@ -254,17 +328,17 @@ async def process_email_batch():
 async def main_loop():
     """Main worker loop."""
     try:
-        Config.validate()
+        settings.validate()
     except ValueError as e:
         logger.error(f"Configuration validation failed: {e}")
         raise
     
     # Validate timezone configuration
     try:
-        ZoneInfo(Config.TIMEZONE)
-        logger.info(f"Using timezone: {Config.TIMEZONE}")
+        ZoneInfo(settings.TIMEZONE)
+        logger.info(f"Using timezone: {settings.TIMEZONE}")
     except Exception as e:
-        logger.warning(f"Invalid timezone '{Config.TIMEZONE}', will fall back to UTC: {e}")
+        logger.warning(f"Invalid timezone '{settings.TIMEZONE}', will fall back to UTC: {e}")
     
     logger.info("Campaign runner worker starting...")
     
@@ -277,7 +351,7 @@ async def main_loop():
                  # Log every 60 seconds (since POLL_INTERVAL is 60)
                  logger.info(
                     "Outside working hours (9am-5pm), sleeping...",
-                    extra={"timezone": Config.TIMEZONE}
+                    extra={"timezone": settings.TIMEZONE}
                  )
                  pass
 
@@ -293,7 +367,10 @@ async def main_loop():
 
 
 async def main():
-    await main_loop()
+    try:
+        await main_loop()
+    finally:
+        await close_sparkpost_client()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,24 @@
 """Prompt engineering and AI generation logic."""
 
-import json
-from typing import List, Dict, Any, Optional
+import logging
+from typing import List, Dict, Any, Optional, Type, TypeVar
 from pydantic import BaseModel, Field
 
 # Gemini imports - commented out for potential rollback
 # from google import genai
 from groq import Groq
-from config import Config
+from config import settings
+
+logger = logging.getLogger(__name__)
 
 # Initialize Groq client
-groq_client = Groq(api_key=Config.GROQ_API_KEY)
+groq_client = Groq(api_key=settings.GROQ_API_KEY)
 
 # Gemini client initialization - commented out
-# client = genai.Client(api_key=Config.GEMINI_API_KEY)
+# client = genai.Client(api_key=settings.GEMINI_API_KEY)
+
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
 
 
 class GeneratedSection(BaseModel):
@@ -27,22 +32,138 @@ class GenerationResponse(BaseModel):
     sections: List[GeneratedSection]
 
 
-def build_prompt(
+class RecipientOutput(BaseModel):
+    """Generated sections for one recipient of a batched prompt."""
+    recipient_index: int = Field(description="The index of the recipient in the RECIPIENTS list")
+    sections: List[GeneratedSection]
+
+
+class BatchGenerationResponse(BaseModel):
+    """Structured response from the AI for several recipients at once."""
+    recipients: List[RecipientOutput]
+
+
+# Schemas passed with every Groq request, by response model; generated once
+_RESPONSE_FORMATS = {
+    response_model: {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema_name,
+            "schema": response_model.model_json_schema(),
+        }
+    }
+    for response_model, schema_name in [
+        (GenerationResponse, "generation_response"),
+        (BatchGenerationResponse, "batch_generation_response"),
+    ]
+}
+
+
+# Try primary model first, fallback to base model on rate limits
+MODELS_TO_TRY = [
+    "moonshotai/kimi-k2-instruct-0905",  # Primary model with version
+    "moonshotai/kimi-k2-instruct"        # Fallback model without version suffix
+]
+
+
+def build_prompt_context(
     all_sections: List[Dict[str, Any]],
-    personalized_sections: List[Dict[str, Any]],
-    recipient_data: Dict[str, Any]
+    personalized_sections: Optional[List[Dict[str, Any]]] = None
 ) -> str:
-    """Build the prompt for a single recipient.
+    """Build the campaign part of the prompt, shared by all its recipients.
     
     Args:
         all_sections: List of all section objects from the campaign
         personalized_sections: List of sections that need generation
+            (derived from all_sections when omitted)
+        
+    Returns:
+        The email structure and sections-to-generate blocks
+    """
+    if personalized_sections is None:
+        personalized_sections = [
+            s for s in all_sections
+            if s.get('mode') == 'personalized'
+        ]
+    
+    email_structure = _email_structure(all_sections)
+    sections_list = _sections_list(personalized_sections)
+    
+    return f"""EMAIL STRUCTURE (for context):
+{email_structure}
+
+---
+
+SECTIONS TO GENERATE:
+{sections_list}
+
+---"""
+
+
+def build_prompt(
+    prompt_context: str,
+    recipient_data: Dict[str, Any]
+) -> str:
+    """Build the prompt for a single recipient.
+    
+    Args:
+        prompt_context: Campaign part of the prompt from build_prompt_context
         recipient_data: Dictionary of CSV fields for the recipient
         
     Returns:
         The constructed prompt string
     """
-    # 1. Build Email Structure Overview
+    fields_str = _recipient_fields(recipient_data)
+    
+    return f"""You are generating personalized email content for a recipient.
+
+{prompt_context}
+
+RECIPIENT DATA:
+{fields_str}
+
+---
+
+Generate the [GENERATE] sections for this recipient. Follow the instructions provided for each section.
+Return content that flows naturally with the static sections around it.
+Keep each section concise (1-3 sentences)."""
+
+
+def build_batch_prompt(
+    prompt_context: str,
+    recipient_batch: List[Dict[str, Any]]
+) -> str:
+    """Build one prompt that generates the sections for several recipients.
+    
+    Args:
+        prompt_context: Campaign part of the prompt from build_prompt_context
+        recipient_batch: CSV field dictionaries, one per recipient
+        
+    Returns:
+        The constructed prompt string
+    """
+    recipients_str = '\n\n'.join(
+        f'### Recipient {i}\n{_recipient_fields(recipient_data)}'
+        for i, recipient_data in enumerate(recipient_batch)
+    )
+    
+    return f"""You are generating personalized email content for {len(recipient_batch)} recipients.
+
+{prompt_context}
+
+RECIPIENTS:
+{recipients_str}
+
+---
+
+Generate the [GENERATE] sections separately for every recipient, using only that recipient's data.
+Return one entry per recipient with its recipient_index. Follow the instructions provided for each section.
+Return content that flows naturally with the static sections around it.
+Keep each section concise (1-3 sentences)."""
+
+
+def _email_structure(all_sections: List[Dict[str, Any]]) -> str:
+    """Describe every section in order, as context for the model."""
     sorted_sections = sorted(all_sections, key=lambda s: s.get('order', 0))
     
     structure_lines = []
@@ -74,9 +195,11 @@ def build_prompt(
                 plain = plain[:150] + '...'
             structure_lines.append(f'{i + 1}. [STATIC] "{s_name}": "{plain}"')
             
-    email_structure = '\n\n'.join(structure_lines)
-    
-    # 2. Build Recipient Fields
+    return '\n\n'.join(structure_lines)
+
+
+def _recipient_fields(recipient_data: Dict[str, Any]) -> str:
+    """Format a recipient's fields, one per line."""
     # Filter out email to avoid confusion/PII leakage if not needed
     relevant_fields = {
         k: v for k, v in recipient_data.items() 
@@ -86,45 +209,28 @@ def build_prompt(
     fields_lines = []
     for k, v in relevant_fields.items():
         fields_lines.append(f'  {k}: {v or "(not provided)"}')
-    fields_str = '\n'.join(fields_lines)
-    
-    # 3. Sections to Generate List
-    sections_list = '\n'.join([
+    return '\n'.join(fields_lines)
+
+
+def _sections_list(personalized_sections: List[Dict[str, Any]]) -> str:
+    """List the sections the model has to generate."""
+    return '\n'.join([
         f'- "{s.get("name")}" (ID: {s.get("id")})' 
         for s in personalized_sections
     ])
-    
-    return f"""You are generating personalized email content for a recipient.
-
-EMAIL STRUCTURE (for context):
-{email_structure}
-
----
-
-SECTIONS TO GENERATE:
-{sections_list}
-
----
-
-RECIPIENT DATA:
-{fields_str}
-
----
-
-Generate the [GENERATE] sections for this recipient. Follow the instructions provided for each section.
-Return content that flows naturally with the static sections around it.
-Keep each section concise (1-3 sentences)."""
 
 
 def generate_content(
     all_sections: List[Dict[str, Any]],
-    recipient_data: Dict[str, Any]
+    recipient_data: Dict[str, Any],
+    prompt_context: Optional[str] = None
 ) -> Dict[str, str]:
     """Generate content for a single recipient using Groq.
 
     Args:
         all_sections: Full list of campaign sections
         recipient_data: Recipient metadata/CSV row
+        prompt_context: Precomputed build_prompt_context(all_sections)
 
     Returns:
         Dictionary mapping section_id -> generated_content
@@ -137,15 +243,67 @@ def generate_content(
     if not personalized_sections:
         return {}
 
-    prompt = build_prompt(all_sections, personalized_sections, recipient_data)
+    if prompt_context is None:
+        prompt_context = build_prompt_context(all_sections, personalized_sections)
+    prompt = build_prompt(prompt_context, recipient_data)
+    parsed_response = _generate_structured(prompt, GenerationResponse)
+
+    # Map back to dict
+    result_map = {}
+    for section in parsed_response.sections:
+        result_map[section.section_id] = section.content
+
+    return result_map
+
 
-    # Try primary model first, fallback to base model on rate limits
-    models_to_try = [
-        "moonshotai/kimi-k2-instruct-0905",  # Primary model with version
-        "moonshotai/kimi-k2-instruct"        # Fallback model without version suffix
+def generate_content_batch(
+    all_sections: List[Dict[str, Any]],
+    recipient_batch: List[Dict[str, Any]],
+    prompt_context: Optional[str] = None
+) -> List[Optional[Dict[str, str]]]:
+    """Generate content for several recipients of one campaign in one Groq call.
+
+    Args:
+        all_sections: Full list of campaign sections
+        recipient_batch: Recipient metadata/CSV rows
+        prompt_context: Precomputed build_prompt_context(all_sections)
+
+    Returns:
+        One section_id -> generated_content dict per recipient, in order;
+        None for any recipient the model left out of its response
+    """
+    personalized_sections = [
+        s for s in all_sections
+        if s.get('mode') == 'personalized'
     ]
 
-    for model in models_to_try:
+    if not personalized_sections:
+        return [{} for _ in recipient_batch]
+
+    if prompt_context is None:
+        prompt_context = build_prompt_context(all_sections, personalized_sections)
+
+    if len(recipient_batch) == 1:
+        return [generate_content(all_sections, recipient_batch[0], prompt_context)]
+
+    prompt = build_batch_prompt(prompt_context, recipient_batch)
+    parsed_response = _generate_structured(prompt, BatchGenerationResponse)
+
+    # Fan results back out by recipient index
+    results: List[Optional[Dict[str, str]]] = [None] * len(recipient_batch)
+    for recipient in parsed_response.recipients:
+        if 0 <= recipient.recipient_index < len(recipient_batch):
+            results[recipient.recipient_index] = {
+                section.section_id: section.content
+                for section in recipient.sections
+            }
+
+    return results
+
+
+def _generate_structured(prompt: str, response_model: Type[ResponseModel]) -> ResponseModel:
+    """Run a JSON-schema constrained Groq completion and validate the result."""
+    for model in MODELS_TO_TRY:
         try:
             # Groq implementation
             response = groq_client.chat.completions.create(
@@ -156,13 +314,7 @@ def generate_content(
                         "content": prompt,
                     }
                 ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "generation_response",
-                        "schema": GenerationResponse.model_json_schema(),
-                    }
-                },
+                response_format=_RESPONSE_FORMATS[response_model],
             )
 
             # Parse JSON response from Groq
@@ -171,15 +323,7 @@ def generate_content(
                 raise ValueError("Empty response from AI")
 
             # Parse JSON and validate with Pydantic
-            response_data = json.loads(response_content)
-            parsed_response = GenerationResponse.model_validate(response_data)
-
-            # Map back to dict
-            result_map = {}
-            for section in parsed_response.sections:
-                result_map[section.section_id] = section.content
-
-            return result_map
+            return response_model.model_validate_json(response_content)
 
         except Exception as e:
             error_msg = str(e).lower()
@@ -191,11 +335,11 @@ def generate_content(
                 "quota exceeded" in error_msg
             )
 
-            if is_rate_limit and model != models_to_try[-1]:
-                print(f"Rate limit hit with model '{model}', trying fallback model '{models_to_try[models_to_try.index(model) + 1]}'")
+            if is_rate_limit and model != MODELS_TO_TRY[-1]:
+                logger.warning("Rate limit hit with model '%s', trying fallback model '%s'", model, MODELS_TO_TRY[MODELS_TO_TRY.index(model) + 1])
                 continue
             else:
-                print(f"AI Generation Error with model '{model}': {e}")
+                logger.error("AI Generation Error with model '%s': %s", model, e)
                 # Re-raise to trigger retry logic in main loop
                 raise e
     